@@ -1,11 +1,15 @@
-from gamestatenode import GameStateNode
+from gamestatenode import GameStateNode, ZobristKeys
 from copy import deepcopy
 import re
+import random
 
 """
 A GameStateNode representation of the game Connect Four.
 """
 
+# Zobrist keys for tokens (row, col, piece) and ('player', current_player)
+ZOBRIST_KEYS = ZobristKeys("connectfour")
+
 class ConnectFourGameState(GameStateNode):
 
     num_rows = 6  # board height
@@ -91,16 +95,18 @@ class ConnectFourGameState(GameStateNode):
     path_length: the number of actions taken in the path to reach the state (aka number of plies)
     previous_action: whatever action was last taken to arrive at this state
     current_player: the number of the player whose turn it is to take an action
+    zobrist_key: (optional) Zobrist key of the state, if already known
 
     Use super().__init__() to call this function in the subclass __init__()
     """
     def __init__(self, board_array,
-        parent, path_length, previous_action, current_player) :
+        parent, path_length, previous_action, current_player, zobrist_key = None) :
         self.board_array = board_array
         super().__init__(parent = parent,
             path_length = path_length,
             previous_action = previous_action,
-            current_player = current_player)
+            current_player = current_player,
+            zobrist_key = zobrist_key)
 
     """
     Returns a full feature representation of the environment's current state.
@@ -114,6 +120,18 @@ class ConnectFourGameState(GameStateNode):
     def get_all_features(self) :
         return tuple(tuple(row) for row in self.board_array)
 
+    """
+    Computes the Zobrist key from scratch: the XOR of the keys of every
+    piece on the board and of the current player.
+    """
+    def compute_zobrist_key(self) :
+        key = ZOBRIST_KEYS[('player', self.current_player)]
+        for r, row in enumerate(self.board_array):
+            for c, piece in enumerate(row):
+                if piece != 0:
+                    key ^= ZOBRIST_KEYS[(r, c, piece)]
+        return key
+
     """
     Returns number of winning player if an endgame state.
     If no winning player, return 0.
@@ -221,6 +239,11 @@ class ConnectFourGameState(GameStateNode):
 
         new_board = deepcopy(self.board_array)
         new_board[r][action] = self.current_player
+        next_player = self.current_player % 2 + 1
+
+        # Incremental Zobrist update: add the new piece, swap the current player
+        new_key = (self.get_zobrist_key() ^ ZOBRIST_KEYS[(r, action, self.current_player)]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
 
         # ( self.board_array[:r]                        # using slicing to create
         #             + ( self.board_array[r][:action]        # a new 2-d tuple
@@ -232,11 +255,65 @@ class ConnectFourGameState(GameStateNode):
             parent = self,
             path_length = self.path_length + 1,
             previous_action = action,
-            current_player = self.current_player % 2 + 1)
+            current_player = next_player,
+            zobrist_key = new_key)
+
 
 
 
 
+    """
+    Apply the action to this state in place (see GameStateNode.make_move).
+    """
+    def make_move(self, action) :
+        r = ConnectFourGameState.num_rows - self.get_column_height(action) - 1
+        next_player = self.current_player % 2 + 1
+        new_key = (self.get_zobrist_key() ^ ZOBRIST_KEYS[(r, action, self.current_player)]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
+        self.board_array[r][action] = self.current_player
+        self.push_undo_record(action, next_player, new_key)
+
+    """
+    Undo the last make_move (see GameStateNode.unmake_move).
+    The piece to remove is the top piece of the last played column.
+    """
+    def unmake_move(self) :
+        action = self.previous_action
+        r = ConnectFourGameState.num_rows - self.get_column_height(action)
+        self.pop_undo_record()
+        self.board_array[r][action] = 0
+
+    """
+    Play random moves until the game ends (see GameStateNode.random_playout),
+    directly on a copy of the board, tracking column heights and only checking
+    the lines through each new piece for a win.
+    """
+    def random_playout(self, moves_played = None) :
+        num_rows, num_cols = ConnectFourGameState.num_rows, ConnectFourGameState.num_cols
+        board = [row[:] for row in self.board_array]
+        heights = [self.get_column_height(col) for col in range(num_cols)]
+        player, path_length, action = self.current_player, self.path_length, self.previous_action
+        # (A board read from a file may already be won)
+        open_cols = [] if self.endgame_winner() else [col for col in range(num_cols) if heights[col] < num_rows]
+        while open_cols:
+            action = random.choice(open_cols)
+            if moves_played is not None:
+                moves_played.append((player, action))
+            r = num_rows - heights[action] - 1
+            board[r][action] = player
+            heights[action] += 1
+            if heights[action] == num_rows:
+                open_cols.remove(action)
+            path_length += 1
+            won = connects_four(board, r, action, player)
+            player = player % 2 + 1
+            if won:
+                break
+        return ConnectFourGameState(board_array = board,
+            parent = None,
+            path_length = path_length,
+            previous_action = action,
+            current_player = player)
 
     """
     Return a string representation of the State
@@ -326,3 +403,311 @@ class ConnectFourGameState(GameStateNode):
                     count += 1
 
         return count
+
+
+
+def connects_four(board, row, col, piece):
+    """Return True if the piece at (row, col) of a 2-d list board is part of 4 in a row."""
+    num_rows, num_cols = ConnectFourGameState.num_rows, ConnectFourGameState.num_cols
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            r, c = row + sign * dr, col + sign * dc
+            while 0 <= r < num_rows and 0 <= c < num_cols and board[r][c] == piece:
+                count += 1
+                r, c = r + sign * dr, c + sign * dc
+        if count >= 4:
+            return True
+    return False
+
+
+"""
+Bitboard constants for ConnectFourBitboardGameState.
+
+Each column is stored as num_rows + 1 bits (bottom row first), with an
+always-empty sentinel bit on top so shifts never carry a chain from one
+column into the next.
+"""
+BITBOARD_COL_HEIGHT = ConnectFourGameState.num_rows + 1
+BITBOARD_BOTTOM_MASKS = tuple(1 << (col * BITBOARD_COL_HEIGHT) for col in range(ConnectFourGameState.num_cols))
+BITBOARD_TOP_MASKS = tuple(bottom << (ConnectFourGameState.num_rows - 1) for bottom in BITBOARD_BOTTOM_MASKS)
+BITBOARD_COLUMN_MASKS = tuple(((1 << ConnectFourGameState.num_rows) - 1) << (col * BITBOARD_COL_HEIGHT) for col in range(ConnectFourGameState.num_cols))
+BITBOARD_FULL_MASK = sum(BITBOARD_COLUMN_MASKS)
+BITBOARD_BOTTOM_ROW = sum(BITBOARD_BOTTOM_MASKS)
+# Bit shifts for vertical, horizontal, diagonal up-right and diagonal down-right lines.
+BITBOARD_VERTICAL_SHIFT = 1
+BITBOARD_HORIZONTAL_SHIFT = BITBOARD_COL_HEIGHT
+BITBOARD_DIAGONAL_SHIFTS = (BITBOARD_COL_HEIGHT + 1, BITBOARD_COL_HEIGHT - 1)
+
+
+def bitboard_cell(row, col):
+    """Return the single bit for board position (row, col), where row 0 is the top row."""
+    return 1 << (col * BITBOARD_COL_HEIGHT + ConnectFourGameState.num_rows - 1 - row)
+
+def bitboard_popcount(bits):
+    """Return the number of set bits."""
+    return bin(bits).count("1")
+
+def bitboard_chains(stones, chain_len, shift):
+    """Return a bitboard marking the first stone of every chain of chain_len stones in the shift direction."""
+    chains = stones
+    for i in range(1, chain_len):
+        chains &= stones >> (i * shift)
+    return chains
+
+def bitboard_has_four(stones):
+    """Return True if stones contains 4 in a row in any direction, using shift-and-AND."""
+    for shift in (BITBOARD_VERTICAL_SHIFT, BITBOARD_HORIZONTAL_SHIFT) + BITBOARD_DIAGONAL_SHIFTS:
+        pairs = stones & (stones >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+class ConnectFourBitboardGameState(ConnectFourGameState):
+    """
+    A bitboard backend for ConnectFourGameState, with the same GameStateNode API.
+
+    The board is stored as two ints used as uint64 bitboards:
+    position: the stones of the current player
+    mask: all stones on the board
+    (the other player's stones are position ^ mask).
+
+    Making a move, checking for a win, and hashing are all a handful of
+    integer operations, instead of copying and rescanning a 2-d list.
+    board_array is still available (built on demand) for the GUIs and
+    evaluation functions that read it.
+    """
+
+    """
+    A 'static' method that reads data from a text file and returns
+    a GameStateNode which is an initial state.
+    """
+    @staticmethod
+    def readFromFile(filename):
+        list_state = ConnectFourGameState.readFromFile(filename)
+        return ConnectFourBitboardGameState.from_board_array(list_state.board_array, list_state.current_player)
+
+    """
+    A 'static' method that creates some default
+    GameStateNode which is an initial state (e.g. standard blank board).
+    """
+    @staticmethod
+    def defaultInitialState():
+        return ConnectFourBitboardGameState(
+            position = 0,
+            mask = 0,
+            parent = None,
+            path_length = 0,
+            previous_action = None,
+            current_player = 1)
+
+    """
+    A 'static' method that converts a 2-d list board (as used by ConnectFourGameState)
+    into a root ConnectFourBitboardGameState.
+    """
+    @staticmethod
+    def from_board_array(board_array, current_player):
+        position, mask = 0, 0
+        for r, row in enumerate(board_array):
+            for c, piece in enumerate(row):
+                if piece != 0:
+                    mask |= bitboard_cell(r, c)
+                    if piece == current_player:
+                        position |= bitboard_cell(r, c)
+        return ConnectFourBitboardGameState(
+            position = position,
+            mask = mask,
+            parent = None,
+            path_length = 0,
+            previous_action = None,
+            current_player = current_player)
+
+    """
+    Creates a game state node.
+    Takes:
+
+    position: bitboard of the current player's stones
+    mask: bitboard of all stones on the board
+
+    parent, path_length, previous_action, current_player: as in ConnectFourGameState.
+    """
+    def __init__(self, position, mask,
+        parent, path_length, previous_action, current_player, zobrist_key = None) :
+        self.position = position
+        self.mask = mask
+        self._board_array = None
+        GameStateNode.__init__(self, parent = parent,
+            path_length = path_length,
+            previous_action = previous_action,
+            current_player = current_player,
+            zobrist_key = zobrist_key)
+
+    """
+    A 2-d list view of the board, in the same format as ConnectFourGameState.board_array.
+    Built on first access and cached, since the state never changes.
+    """
+    @property
+    def board_array(self):
+        if self._board_array is None:
+            other_player = self.current_player % 2 + 1
+            self._board_array = [[0 if not (self.mask & bitboard_cell(r, c))
+                                    else (self.current_player if self.position & bitboard_cell(r, c) else other_player)
+                                    for c in range(ConnectFourGameState.num_cols)]
+                                    for r in range(ConnectFourGameState.num_rows)]
+        return self._board_array
+
+    """
+    Returns a full feature representation of the environment's current state.
+    For bitboards this is just the two ints and the current player - O(1).
+    """
+    def get_all_features(self) :
+        return self.position, self.mask, self.current_player
+
+    """
+    Bitboards don't need a Zobrist table: position + mask + (bottom row bits) is
+    already a unique key for the board (< 2^49), so with the current player
+    appended it is a perfect 64-bit key, computed in O(1).
+    """
+    def compute_zobrist_key(self) :
+        return ((self.position + self.mask + BITBOARD_BOTTOM_ROW) << 1) | (self.current_player - 1)
+
+    def __eq__(self, other) :
+        return (isinstance(other, ConnectFourBitboardGameState) and self.position == other.position
+            and self.mask == other.mask and self.current_player == other.current_player)
+
+    def __hash__(self) :
+        return self.get_zobrist_key()
+
+    """
+    Returns number of winning player if an endgame state.
+    If no winning player, return 0.
+
+    Only the player who just moved can normally have won, but both are checked
+    so boards read from files are handled correctly.
+    """
+    def endgame_winner(self) :
+        if bitboard_has_four(self.position ^ self.mask):
+            return self.current_player % 2 + 1
+        if bitboard_has_four(self.position):
+            return self.current_player
+        return 0
+
+    """
+    Returns whether or not this state is an endgame (terminal) state.
+    """
+    def is_endgame_state(self) :
+        return self.mask == BITBOARD_FULL_MASK or self.endgame_winner() != 0
+
+    """
+    Generate and return an iterable (e.g. a list) of all possible actions.
+    In ConnectFour, actions are column numbers.
+    """
+    def get_all_actions(self, custom_move_ordering = False):
+        actions = [col for col in range(ConnectFourGameState.num_cols)
+                    if not (self.mask & BITBOARD_TOP_MASKS[col])]
+        return sorted(actions, key = lambda col : abs( ConnectFourGameState.center_column - col)) if custom_move_ordering else actions
+
+    """
+    Generate and return the next state (GameStateNode object) that would
+    result from the given action.
+    Does NOT modify this state.
+
+    Adding BITBOARD_BOTTOM_MASKS[action] to the mask carries up the column to its
+    lowest empty cell; the new current player's stones are the old opponent's.
+    """
+    def generate_next_state(self, action) :
+        if action not in range(ConnectFourGameState.num_cols) or (self.mask & BITBOARD_TOP_MASKS[action]) :
+            raise IndexError("Can't add piece to column "+str(action)+".")
+
+        return ConnectFourBitboardGameState(
+            position = self.position ^ self.mask,
+            mask = self.mask | (self.mask + BITBOARD_BOTTOM_MASKS[action]),
+            parent = self,
+            path_length = self.path_length + 1,
+            previous_action = action,
+            current_player = self.current_player % 2 + 1)
+
+    """
+    Apply the action to this state in place (see GameStateNode.make_move).
+    The old bitboards are the undo record.
+    """
+    def make_move(self, action) :
+        undo_info = (self.position, self.mask)
+        self.position, self.mask = self.position ^ self.mask, self.mask | (self.mask + BITBOARD_BOTTOM_MASKS[action])
+        self._board_array = None
+        self.push_undo_record(action, self.current_player % 2 + 1, None, undo_info)
+
+    """
+    Undo the last make_move (see GameStateNode.unmake_move).
+    """
+    def unmake_move(self) :
+        self.position, self.mask = self.pop_undo_record()
+        self._board_array = None
+
+    """
+    Play random moves until the game ends (see GameStateNode.random_playout),
+    on the two bitboard ints alone; only the mover's stones are checked for a win.
+    """
+    def random_playout(self, moves_played = None) :
+        position, mask = self.position, self.mask
+        player, path_length, action = self.current_player, self.path_length, self.previous_action
+        open_cols = [] if self.endgame_winner() else [col for col in range(ConnectFourGameState.num_cols)
+                                                        if not (mask & BITBOARD_TOP_MASKS[col])]
+        while open_cols:
+            action = random.choice(open_cols)
+            if moves_played is not None:
+                moves_played.append((player, action))
+            new_mask = mask | (mask + BITBOARD_BOTTOM_MASKS[action])
+            if new_mask & BITBOARD_TOP_MASKS[action]:
+                open_cols.remove(action)
+            mover_stones = position | (new_mask ^ mask)
+            # The next player's stones are the old opponent's
+            position, mask = mover_stones ^ new_mask, new_mask
+            path_length += 1
+            player = player % 2 + 1
+            if bitboard_has_four(mover_stones):
+                break
+        return ConnectFourBitboardGameState(
+            position = position,
+            mask = mask,
+            parent = None,
+            path_length = path_length,
+            previous_action = action,
+            current_player = player)
+
+    """ Additional ConnectFour specific methods, using bit operations """
+
+    def get_column_height(self, col_number):
+        return bitboard_popcount(self.mask & BITBOARD_COLUMN_MASKS[col_number])
+
+    def is_column_full(self, col_number) :
+        return (self.mask & BITBOARD_TOP_MASKS[col_number]) != 0
+
+    def get_piece_at(self, row, col):
+        cell = bitboard_cell(row, col)
+        if not (self.mask & cell):
+            return 0
+        return self.current_player if self.position & cell else self.current_player % 2 + 1
+
+    def get_stones(self, piece):
+        """Return the bitboard of piece's stones."""
+        return self.position if piece == self.current_player else self.position ^ self.mask
+
+    def get_num_chains(self, chain_len, piece):
+        if chain_len > 1:
+            return (self.get_num_chains_hor(chain_len, piece) +
+                self.get_num_chains_ver(chain_len, piece) +
+                self.get_num_chains_diag(chain_len, piece) )
+        else : # if len 1, don't repeat count
+                return bitboard_popcount(self.get_stones(piece))
+
+    def get_num_chains_hor(self, chain_len, piece):
+        return bitboard_popcount(bitboard_chains(self.get_stones(piece), chain_len, BITBOARD_HORIZONTAL_SHIFT))
+
+    def get_num_chains_ver(self, chain_len, piece):
+        return bitboard_popcount(bitboard_chains(self.get_stones(piece), chain_len, BITBOARD_VERTICAL_SHIFT))
+
+    def get_num_chains_diag(self, chain_len, piece):
+        stones = self.get_stones(piece)
+        return sum(bitboard_popcount(bitboard_chains(stones, chain_len, shift)) for shift in BITBOARD_DIAGONAL_SHIFTS)
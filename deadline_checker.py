@@ -0,0 +1,74 @@
+from __future__ import annotations
+from typing import Union
+from time import time
+
+INF = float('inf')
+
+
+class DeadlineChecker:
+    """
+    Tells time-limited (anytime) searches when their time limit has passed,
+    without reading the clock at every node.
+
+    time_up() is meant to be called once per node (or simulation). It only reads
+    the clock every stride calls, where stride is re-tuned at every reading from the
+    measured rate of calls, so that readings are about check_interval seconds apart
+    (and never farther apart than the time left). The stride at most doubles per reading,
+    so a burst of fast calls can't make it jump past slower ones.
+    So the search overshoots its time limit by about check_interval at most,
+    while almost all calls are a countdown.
+
+    Once the deadline has passed, time_up() keeps returning True.
+
+    max_calls is a budget on the number of calls (e.g. nodes or simulations): the first
+    max_calls calls can return False, and every later one returns True. Unlike the time limit,
+    it is exact, so searches bounded by it are reproducible across machines and load.
+    The countdown is just cut short to end on the budget, so it costs nothing extra per call.
+    """
+    def __init__(self, time_limit : Union[int, float] = INF,
+            check_interval : float = 0.005, max_stride : int = 4096,
+            max_calls : Union[int, float] = INF):
+        self.start_time = time()
+        self.end_time = self.start_time + time_limit
+        self.check_interval = check_interval
+        self.max_stride = max_stride
+        self.max_calls = max_calls
+        self.stride = 1 # calls between clock readings
+        self.countdown = 1
+        self.countdown_start = 1 # what the countdown was last set to
+        self.num_calls = 0 # calls counted as of the last reading
+        self.last_check_time = None # the first reading only starts the measurement
+        self.expired = False
+        self.num_checks = 0 # clock readings so far
+
+    def time_up(self) -> bool:
+        """ Call once per node; True once the deadline has passed """
+        self.countdown -= 1
+        if self.countdown > 0:
+            return self.expired
+        return self.check_now()
+
+    def check_now(self) -> bool:
+        """ Read the clock now (and re-tune the stride); True once the deadline has passed """
+        now = time()
+        self.num_checks += 1
+        num_new_calls = self.countdown_start - self.countdown
+        self.num_calls += num_new_calls
+        if now >= self.end_time or self.num_calls > self.max_calls:
+            self.expired = True
+        elif self.last_check_time is not None:
+            elapsed = now - self.last_check_time
+            if elapsed <= 0: # the clock didn't tick - calls are too fast to measure, so sample less often
+                stride = self.stride * 2
+            else:
+                calls_per_sec = num_new_calls / elapsed
+                stride = min(calls_per_sec * min(self.check_interval, self.end_time - now), self.stride * 2)
+            self.stride = max(1, min(int(stride), self.max_stride))
+        # Cut the countdown short to end on the call that exceeds the budget
+        self.countdown = self.countdown_start = max(1, min(self.stride, self.max_calls + 1 - self.num_calls))
+        self.last_check_time = now
+        return self.expired
+
+    def time_left(self) -> float:
+        """ Seconds until the deadline (reads the clock) """
+        return max(0.0, self.end_time - time())
@@ -1,4 +1,6 @@
 from lab2_algorithms import *
+from transposition_table import TranspositionTable
+from shared_transposition_table import SharedTranspositionTable
 from time import time
 from math import sqrt
 from lab2_util_eval import all_fn_dicts, always_zero
@@ -73,9 +75,55 @@ def get_float(prompt):
 class GamePlayingAgent:
     """ An abstract class for Game Playing Agents, either human or AI.
     """
+    """ Whether to keep one transposition table across choose_action calls (rather than one per search),
+    and how many of this agent's moves an entry survives without being used again. """
+    transposition_table = False
+    keep_transposition_table = False
+    transposition_table_max_age = 2
+
     def __init__(self, game_class, name = None):
         self.name = name
         self.game_class = game_class
+        self.kept_transposition_table = None
+
+    def new_game(self):
+        """
+        Called by runners before (re)starting a game.
+        Forgets anything kept from previous games.
+        """
+        self.reset_transposition_table()
+
+    def get_transposition_table(self):
+        """ The TranspositionTable kept between moves (None if not kept, or nothing searched yet) """
+        return self.kept_transposition_table
+
+    def reset_transposition_table(self):
+        """ Discard the TranspositionTable kept between moves """
+        self.kept_transposition_table = None
+
+    def search_options(self):
+        """ Extra keyword arguments for search_alg, for settings only some algorithms take """
+        return {}
+
+    def search_transposition_table(self):
+        """
+        What to pass as the transposition_table parameter of a search:
+        the table kept between moves, advanced to a new generation (evicting stale entries),
+        or just the True/False setting if not keeping one.
+        """
+        if not (self.transposition_table and self.keep_transposition_table):
+            return self.transposition_table
+        if self.kept_transposition_table is None:
+            self.kept_transposition_table = TranspositionTable()
+        else:
+            self.kept_transposition_table.next_generation(max_age = self.transposition_table_max_age)
+        return self.kept_transposition_table
+
+    def print_transposition_table_stats(self):
+        t_table = self.get_transposition_table()
+        if t_table is not None:
+            print("Transposition table: {} entries (generation {}) | {}".format(len(t_table), t_table.generation,
+                " | ".join("{}: {}".format(stat, t_table.stats[stat]) for stat in t_table.stats)))
 
     def set_up(self, **kwargs):
         """
@@ -185,6 +233,8 @@ class ClassicSearchAgent(GamePlayingAgent) :
                 self.random_move_order = ask_yes_no("Random move order? >>> ")
             if 'transposition_table' not in kwargs:
                 self.transposition_table = ask_yes_no("Use a transposition table? >>> ")
+            if 'keep_transposition_table' not in kwargs and self.transposition_table:
+                self.keep_transposition_table = ask_yes_no("Keep the transposition table between moves? >>> ")
         else:
             self.random_move_order = False
             self.transposition_table = False
@@ -218,12 +268,17 @@ class ClassicSearchAgent(GamePlayingAgent) :
             state_callback_fn = kwargs['state_callback_fn'],
             counter = kwargs['counter'],
             random_move_order = self.random_move_order,
-            transposition_table = self.transposition_table
+            transposition_table = self.search_transposition_table(),
+            **self.search_options()
             )
         elapsed_time = time() - search_start_time
         if self.verbose:
             print("{} values this state at utility {:.4f}".format(self.name, exp_util))
             print("{} nodes seen, {} endgame evals, {} heuristic evals ".format(kwargs['counter']['num_nodes_seen'], kwargs['counter']['num_endgame_evals'],kwargs['counter']['num_heuristic_evals']))
+            if 'num_pruned_chance_children' in kwargs['counter']:
+                print("{} chance node cutoffs, {} chance node children pruned".format(
+                    kwargs['counter']['num_star1_cutoffs'] + kwargs['counter'].get('num_star2_cutoffs', 0), kwargs['counter']['num_pruned_chance_children']))
+            self.print_transposition_table_stats()
             print("Total elapsed time: {:.4f}".format(elapsed_time))
         return action, exp_util
 
@@ -245,18 +300,64 @@ class MinimaxSearchAgent(ClassicSearchAgent) :
         super().__init__(game_class, search_alg = MinimaxSearch, name = name)
 
 class ExpectimaxSearchAgent(ClassicSearchAgent) :
+    # If true, prune with Star1 (bounded expectimax, see ExpectimaxSearch)
+    star_pruning = False
+    # If true (and star_pruning), probe first with Star2
+    star2 = False
 
     def __init__(self, game_class, name="Expectimax (Cautiously Optimistic) Player"):
         super().__init__(game_class, search_alg = ExpectimaxSearch, name = name)
 
+    def set_up(self, **kwargs):
+        super().set_up(**kwargs)
+
+        if 'star_pruning' not in kwargs:
+            self.star_pruning = ask_yes_no("Prune chance nodes (Star1 bounded expectimax)? >>> ")
+        if 'star2' not in kwargs and self.star_pruning:
+            self.star2 = ask_yes_no("Probe chance nodes first (Star2)? >>> ")
+
+    def search_options(self):
+        return {'star_pruning': self.star_pruning, 'star2': self.star2} if self.star_pruning else {}
+
 
 class MinimaxAlphaBetaSearchAgent(ClassicSearchAgent) :
+    # How many processes search at once (see ParallelRootAlphaBetaSearch)
+    num_workers = 1
+    # If true, parallel searches split every node, not just the root (see YoungBrothersWaitSearch)
+    young_brothers_wait = False
 
     def __init__(self, game_class, name="Minimax w/ Alpha-Beta (Pessimistic Pruning) Player"):
         super().__init__(game_class, search_alg = MinimaxAlphaBetaSearch, name = name)
 
+    def set_up(self, **kwargs):
+        super().set_up(**kwargs)
+
+        if 'num_workers' not in kwargs:
+            self.num_workers = get_int("Number of parallel search processes (1 = not parallel): >>> ")
+        if 'young_brothers_wait' not in kwargs and self.num_workers > 1:
+            self.young_brothers_wait = ask_yes_no("Split the search at every node, not just the root (Young Brothers Wait)? >>> ")
+        if self.num_workers > 1:
+            self.search_alg = YoungBrothersWaitSearch if self.young_brothers_wait else ParallelRootAlphaBetaSearch
+        else:
+            self.search_alg = MinimaxAlphaBetaSearch
+
+    def search_options(self):
+        return {'num_workers': self.num_workers} if self.num_workers > 1 else {}
+
+class MinimaxAlphaBetaSearchIterativeAgent(ClassicSearchAgent) :
+
+    def __init__(self, game_class, name="Minimax w/ Alpha-Beta (Iterative) Player"):
+        super().__init__(game_class, search_alg = MinimaxAlphaBetaSearchIterative, name = name)
+
 
 class ProgressiveDeepeningSearchAgent(GamePlayingAgent) :
+    # Stop each search after this many nodes (as well as at the time limit); unlike time, reproducible
+    max_nodes = INF
+    # How many processes search at once, sharing a transposition table (see LazySMPProgressiveDeepening)
+    num_workers = 1
+    # If true, find each depth's value by null-window searches only (see MTDfProgressiveDeepening)
+    mtdf = False
+
     def __init__(self, game_class, name="Progressive Deepening Player"):
         self.search_alg = ProgressiveDeepening
         super().__init__(game_class, name)
@@ -285,12 +386,27 @@ class ProgressiveDeepeningSearchAgent(GamePlayingAgent) :
         if 'time_limit' not in kwargs:
             self.time_limit = get_float("Time Limit (seconds): >>> ")
 
+        if 'max_nodes' not in kwargs:
+            self.max_nodes = get_int_or_inf("Node Budget (Max Nodes Searched per Move): >>> ")
+
+        if 'num_workers' not in kwargs:
+            self.num_workers = get_int("Number of parallel search processes (1 = not parallel): >>> ")
+        if 'mtdf' not in kwargs and self.num_workers == 1:
+            self.mtdf = ask_yes_no("Use MTD(f) (null-window searches only)? >>> ")
+        if self.num_workers > 1:
+            self.search_alg = LazySMPProgressiveDeepening
+        else:
+            self.search_alg = MTDfProgressiveDeepening if self.mtdf else ProgressiveDeepening
+
         if 'random_move_order' not in kwargs:
             self.random_move_order = ask_yes_no("Random move order? >>> ")
 
         if 'transposition_table' not in kwargs:
             self.transposition_table = ask_yes_no("Use a transposition table? >>> ")
 
+        if 'keep_transposition_table' not in kwargs and self.transposition_table:
+            self.keep_transposition_table = ask_yes_no("Keep the transposition table between moves? >>> ")
+
         if 'verbose' not in kwargs:
             self.verbose = ask_yes_no("Be verbose? >>> ")
             if self.verbose:
@@ -299,6 +415,15 @@ class ProgressiveDeepeningSearchAgent(GamePlayingAgent) :
         if 'GUI' in kwargs and kwargs['GUI']:
             self.show_thinking = ask_yes_no("Show thinking? (slower) >>> ")
 
+    def search_options(self):
+        return {'num_workers': self.num_workers} if self.num_workers > 1 else {}
+
+    def search_transposition_table(self):
+        # Lazy SMP's processes can only share a table kept in shared memory
+        if self.num_workers > 1 and self.transposition_table and self.keep_transposition_table and self.kept_transposition_table is None:
+            self.kept_transposition_table = SharedTranspositionTable()
+        return super().search_transposition_table()
+
     def choose_action(self, state, **kwargs):
         """
         Return an action for the state and its expected utility (from the perspective of the current player).
@@ -321,8 +446,9 @@ class ProgressiveDeepeningSearchAgent(GamePlayingAgent) :
             state_callback_fn = kwargs['state_callback_fn'],
             counter = kwargs['counter'],
             random_move_order = self.random_move_order,
-            transposition_table = self.transposition_table
-
+            transposition_table = self.search_transposition_table(),
+            max_nodes = self.max_nodes,
+            **self.search_options()
             )
         elapsed_time = time() - search_start_time
         if self.verbose:
@@ -337,6 +463,13 @@ class ProgressiveDeepeningSearchAgent(GamePlayingAgent) :
                     max_cutoff, best_actions[-1], best_exp_utils[-1],
                     ))
             print("Total:\n Nodes seen: {} | Endgame evals: {} | Cutoff evals: {}".format(kwargs['counter']['num_nodes_seen'][0],kwargs['counter']['num_endgame_evals'][0],kwargs['counter']['num_heuristic_evals'][0]))
+            if 'workers' in kwargs['counter']:
+                for n, worker in enumerate(kwargs['counter']['workers']):
+                    print(" Process {}: {} nodes | Nodes/sec: {:.0f} | TT hit rate: {:.1%} | Max cutoff: {}".format(
+                        n, worker['num_nodes_seen'], worker['nodes_per_sec'], worker['tt_hit_rate'], worker['max_cutoff']))
+                print(" Combined Nodes/sec: {:.0f} | TT hit rate: {:.1%}".format(
+                    kwargs['counter']['combined_nodes_per_sec'], kwargs['counter']['combined_tt_hit_rate']))
+            self.print_transposition_table_stats()
             print("Total elapsed time: {:.4f}".format(elapsed_time))
         if max_cutoff > 0:
             return best_actions[-1], best_exp_utils[-1]
@@ -344,9 +477,44 @@ class ProgressiveDeepeningSearchAgent(GamePlayingAgent) :
             return None, None
 
 class MonteCarloTreeSearchAgent(GamePlayingAgent):
+    # How many rollouts to run from each expanded node (see MonteCarloTreeSearch)
+    rollouts_per_expansion = 1
+    # If true, keep the search tree between moves, re-rooted at the next position this agent searches
+    # (its subtree after this agent's move and the opponent's reply), so its simulations are reused.
+    keep_tree = False
+    # How many searches to run in parallel processes, merging their statistics (see RootParallelMonteCarloTreeSearch)
+    num_workers = 1
+    # If true, select with RAVE (AMAF statistics), and how many visits until a node's own statistics weigh as much
+    rave = False
+    rave_equivalence = 1000
+    # If true, prove wins and losses (MCTS-Solver), and stop searching once the position is proven
+    solver = False
+    # The most nodes the search tree may grow to (bounding memory over long time limits)
+    max_tree_nodes = INF
+    # Stop each search after this many simulations (as well as at the time limit); unlike time, reproducible
+    max_simulations = INF
+
     def __init__(self, game_class, name="Monte Carlo Tree Search Player"):
         self.search_alg = MonteCarloTreeSearch
         super().__init__(game_class, name)
+        self.kept_tree_root = None
+
+    def new_game(self):
+        super().new_game()
+        self.kept_tree_root = None
+
+    def search_tree_root(self, state):
+        """
+        What to pass as the root parameter of MonteCarloTreeSearch for state:
+        the node for state in the tree kept from the previous move, made the root
+        (dropping the rest of the tree), or None to start a new tree.
+        """
+        if not self.keep_tree or self.kept_tree_root is None:
+            return None
+        root = self.kept_tree_root.find_descendant(state)
+        if root is not None:
+            root.make_root(state)
+        return root
 
     def set_up(self, **kwargs):
         """
@@ -371,6 +539,23 @@ class MonteCarloTreeSearchAgent(GamePlayingAgent):
         if 'time_limit' not in kwargs:
             self.time_limit = get_float("Time Limit (seconds): >>> ")
 
+        if 'max_simulations' not in kwargs:
+            self.max_simulations = get_int_or_inf("Simulation Budget (Max Simulations per Move): >>> ")
+
+        if 'keep_tree' not in kwargs:
+            self.keep_tree = ask_yes_no("Keep the search tree between moves? >>> ")
+
+        if 'rave' not in kwargs:
+            self.rave = ask_yes_no("Use RAVE (all-moves-as-first statistics)? >>> ")
+            if self.rave and 'rave_equivalence' not in kwargs:
+                self.rave_equivalence = get_float("RAVE equivalence (visits until a move's own statistics count as much; e.g. 1000): >>> ")
+
+        if 'solver' not in kwargs:
+            self.solver = ask_yes_no("Prove wins and losses (MCTS-Solver)? >>> ")
+
+        if 'num_workers' not in kwargs:
+            self.num_workers = get_int("Number of parallel search processes (1 = not parallel): >>> ")
+
         if 'verbose' not in kwargs:
             self.verbose = ask_yes_no("Be verbose? >>> ")
 
@@ -391,20 +576,45 @@ class MonteCarloTreeSearchAgent(GamePlayingAgent):
         if 'counter' not in kwargs :
             kwargs['counter'] = {'num_simulations': 0}
 
+        root = self.search_tree_root(state)
+        if root is None:
+            root = MCTSNode(state)
+        num_reused_simulations = root.num_visits
+
+        parallel_kwargs = {}
+        search_alg = self.search_alg
+        if self.num_workers > 1:
+            search_alg = RootParallelMonteCarloTreeSearch
+            parallel_kwargs['num_workers'] = self.num_workers
+
         search_start_time = time()
-        best_action, best_leaf_state , best_exp_util, num_simulations = MonteCarloTreeSearch(
+        best_action, best_leaf_state , best_exp_util, num_simulations = search_alg(
                                 initial_state = state,
                                 util_fn = self.util_fn,
                                 exploration_bias = self.exploration_bias * sqrt(2),
                                 time_limit = self.time_limit,
                                 state_callback_fn = kwargs['state_callback_fn'],
-                                counter = kwargs['counter']
+                                counter = kwargs['counter'],
+                                rollouts_per_expansion = self.rollouts_per_expansion,
+                                rave = self.rave,
+                                rave_equivalence = self.rave_equivalence,
+                                solver = self.solver,
+                                max_tree_nodes = self.max_tree_nodes,
+                                max_simulations = self.max_simulations,
+                                root = root,
+                                **parallel_kwargs
                                 )
         elapsed_time = time() - search_start_time
+        if self.keep_tree:
+            self.kept_tree_root = root
         if self.verbose:
             print("After {} simulations, best action is {} at exp value {:.4f}.".format(
                 num_simulations, best_action, best_exp_util,
                 ))
-            print("Total elapsed time: {:.4f}".format(elapsed_time))
+            if self.keep_tree:
+                print("{} simulations reused from the previous move's tree".format(num_reused_simulations))
+            print("Search tree: {} nodes".format(kwargs['counter']['num_tree_nodes']))
+            print("Total elapsed time: {:.4f} ({:.0f} simulations/sec)".format(elapsed_time,
+                (num_simulations - num_reused_simulations) / max(elapsed_time, 1e-9)))
 
         return best_action, best_exp_util
@@ -3,6 +3,8 @@ from typing import Optional, Any, Hashable, Sequence, Iterable, TypeVar, List, T
 from abc import ABC, abstractmethod
 
 from copy import deepcopy
+from hashlib import blake2b
+import random
 from xmlrpc.client import boolean
 
 class GameAction(ABC):
@@ -22,6 +24,28 @@ class GameAction(ABC):
         raise NotImplementedError
 
 
+class ZobristKeys(dict):
+    """
+    A table of random 64-bit Zobrist keys, one per hashable "feature token"
+    (e.g. (row, col, piece) for a board game, or ('player', 1) for the player to move).
+
+    A state's Zobrist key is the XOR of the keys of all its feature tokens, so
+    a move can update its parent's key with a few XORs instead of rehashing the whole state.
+
+    Keys are created on first use, and are derived deterministically from the
+    token (and the table's name), so they are the same in every process.
+    """
+    def __init__(self, name : str):
+        super().__init__()
+        self.name = name
+
+    def __missing__(self, token : Hashable) -> int:
+        digest = blake2b(repr((self.name, token)).encode(), digest_size = 8).digest()
+        key = int.from_bytes(digest, 'little')
+        self[token] = key
+        return key
+
+
 """
 This is not meant to be used directly
 as an object, but serves as a abstract parent object for various
@@ -41,6 +65,12 @@ class GameStateNode(ABC):
     path_length : int
     previous_action : Optional[GameAction]
     current_player : int
+    zobrist_key : Optional[int]
+
+    """ Stack of undo records for make_move / unmake_move.
+    A class-level default of None, so only states that are actually
+    modified in place ever allocate one. """
+    undo_stack : Optional[List[Tuple[Optional[GameAction], int, Optional[int], Any]]] = None
 
 
     @staticmethod
@@ -109,7 +139,8 @@ class GameStateNode(ABC):
                 parent : Optional[GameStateNode], 
                 path_length : int, 
                 previous_action : Optional[GameAction], 
-                current_player : int) :
+                current_player : int,
+                zobrist_key : Optional[int] = None) :
         """
         Creates a game state node.
         Takes:
@@ -117,6 +148,9 @@ class GameStateNode(ABC):
         path_length: the number of actions taken in the path to reach the state (aka level or ply)
         previous_action: whatever action was last taken to arrive at this state (None if root)
         current_player: the number of the player whose turn it is to take an action
+        zobrist_key: (optional) the Zobrist key of the state, if already known - usually
+            updated incrementally from the parent's key in generate_next_state.
+            If None, it is computed from scratch the first time it is needed.
 
         In any subclass of GameStateNode, the __init__() should take any
         additional parameters that are needed to define its state.
@@ -127,6 +161,7 @@ class GameStateNode(ABC):
         self.path_length = path_length
         self.previous_action = previous_action
         self.current_player = current_player
+        self.zobrist_key = zobrist_key
 
     @abstractmethod
     def __str__(self) -> str:
@@ -199,6 +234,54 @@ class GameStateNode(ABC):
         """
         raise NotImplementedError
 
+    def make_move(self, action : GameAction) -> None:
+        """
+        (Optional) Apply the action to THIS state in place, instead of creating a successor.
+        Afterwards this state represents the same position that generate_next_state(action)
+        would return (same features, current player, path_length and Zobrist key),
+        except that its parent is unchanged.
+
+        The action must be legal; it is not checked, for speed.
+        Each call must be undone by a matching unmake_move(), in reverse order.
+
+        Subclasses that support in-place search should implement this,
+        using push_undo_record() for the bookkeeping shared by all games.
+        """
+        raise NotImplementedError
+
+    def unmake_move(self) -> None:
+        """
+        (Optional) Undo the most recent make_move() on this state, restoring it exactly.
+
+        Subclasses that support in-place search should implement this,
+        using pop_undo_record() for the bookkeeping shared by all games.
+        """
+        raise NotImplementedError
+
+    def push_undo_record(self, action : GameAction, next_player : int, zobrist_key : Optional[int], undo_info : Any = None) -> None:
+        """
+        Bookkeeping shared by make_move implementations: saves what is needed to undo
+        the move (plus any game-specific undo_info), then advances path_length,
+        previous_action, current_player and zobrist_key.
+        """
+        if self.undo_stack is None:
+            self.undo_stack = []
+        self.undo_stack.append((self.previous_action, self.current_player, self.zobrist_key, undo_info))
+        self.path_length += 1
+        self.previous_action = action
+        self.current_player = next_player
+        self.zobrist_key = zobrist_key
+
+    def pop_undo_record(self) -> Any:
+        """
+        Bookkeeping shared by unmake_move implementations: restores path_length,
+        previous_action, current_player and zobrist_key to before the last make_move,
+        and returns the game-specific undo_info saved with it.
+        """
+        self.previous_action, self.current_player, self.zobrist_key, undo_info = self.undo_stack.pop()
+        self.path_length -= 1
+        return undo_info
+
     def generate_next_states_and_actions(self : GSN, custom_move_ordering : bool = False) -> Sequence[Tuple[GSN, GameAction]] :
         """
         Generate and return a sequence (e.g. a list) of all possible next
@@ -266,20 +349,91 @@ class GameStateNode(ABC):
         clone.previous_action = None
         return clone
 
+    def compute_zobrist_key(self) -> Optional[int]:
+        """
+        Compute this state's Zobrist key from scratch (O(board size)), or
+        return None if the subclass does not support Zobrist hashing.
+
+        Subclasses that support it should override this, and also pass
+        zobrist_key = (the parent's key updated for the action) to the child
+        in generate_next_state, so only the root ever computes it from scratch.
+        """
+        return None
+
+    def get_zobrist_key(self) -> Optional[int]:
+        """
+        Returns the 64-bit Zobrist key of this state, or None if not supported.
+        Computed from scratch at most once per state (usually just at the root).
+        """
+        if self.zobrist_key is None:
+            self.zobrist_key = self.compute_zobrist_key()
+        return self.zobrist_key
+
+    def clone_detached(self : GSN) -> GSN:
+        """
+        Make a clone of this state without its parent chain (so it is cheap to copy),
+        but unlike clone_as_root, keeping path_length and previous_action so
+        path-dependent utilities (e.g. faster_endgame_utility) are unchanged.
+        Useful as a scratch state for make_move / unmake_move.
+        """
+        clone = deepcopy(self, {id(self.parent): None})
+        clone.undo_stack = None
+        return clone
+
+    def amaf_move(self, action : GameAction) -> Hashable:
+        """
+        What action, taken from this state, counts as for "all moves as first" (AMAF)
+        statistics, as used by RAVE in Monte Carlo Tree Search: moves by the same player
+        with equal amaf_moves are treated as the same move, whenever they are played.
+        By default, the action itself. Games whose actions are relative (e.g. directions)
+        should override this with what the move achieves (e.g. the square moved to).
+        """
+        return action
+
+    def random_playout(self : GSN, moves_played : Optional[List[Tuple[int, GameAction]]] = None) -> GSN:
+        """
+        Play uniformly random moves from this state until the game ends, and return
+        the endgame state (this state itself is unchanged). Used for Monte Carlo rollouts.
+        If moves_played (a list) is given, the (player, amaf_move(action)) of each move is appended to it.
+
+        The moves are made on one scratch copy (clone_detached) with make_move, so
+        no GameStateNode is created per move. The returned state has no parent chain,
+        but its path_length counts the moves played (for path-dependent utilities).
+
+        Subclasses may override this with a faster game-specific playout.
+        """
+        scratch = self.clone_detached()
+        while not scratch.is_endgame_state():
+            action = random.choice(scratch.get_all_actions())
+            if moves_played is not None:
+                moves_played.append((scratch.get_current_player(), scratch.amaf_move(action)))
+            scratch.make_move(action)
+        scratch.undo_stack = None # the moves aren't meant to be undone
+        return scratch
+
     def __eq__(self, other) -> bool:
         """
         This is needed to make GameStateNode comparable and usable in Sets/Dicts
-        It compares types and get_all_features().
+        It compares types and Zobrist keys if supported, otherwise get_all_features().
+        (Distinct states sharing a 64-bit Zobrist key are rare enough to ignore.)
         You probably want to leave this function alone, but subclasses could override
         this to be more efficient.
         """
-        return (isinstance(other, type(self)) and (self.get_all_features() == other.get_all_features()))
+        if not isinstance(other, type(self)):
+            return False
+        key = self.get_zobrist_key()
+        if key is not None:
+            return key == other.get_zobrist_key()
+        return self.get_all_features() == other.get_all_features()
 
     def __hash__(self) -> int:
         """
         This is important to make GameStateNode hashable and usable in Sets/Dicts;
-        it hashes get_all_features().
+        it uses the Zobrist key if supported, otherwise hashes get_all_features().
         You probably want to leave this function alone, but subclasses could override
         this to be more efficient.
         """
+        key = self.get_zobrist_key()
+        if key is not None:
+            return key
         return hash(self.get_all_features())
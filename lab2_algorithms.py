@@ -3,14 +3,25 @@
 # Email(s): matwan@bergen.org
 from __future__ import annotations
 # from types import NoneType
-from typing import List, Collection, Tuple, Callable, Optional, Union, Set, Dict, Type, Iterable
+from typing import List, Collection, Tuple, Callable, Optional, Union, Set, Dict, Type, Iterable, Sequence
 
 import random # choice, shuffle methods
+import heapq
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+from collections import deque
 import math # optional, remove later
 from time import time
 from collections import defaultdict # optional, remove later
 from gamestatenode import GameAction, GameStateNode
-from lab2_util_eval import always_zero
+from lab2_util_eval import always_zero, get_value_bounds
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from shared_transposition_table import SharedTranspositionTable
+from move_ordering import MoveOrderer
+from deadline_checker import DeadlineChecker
+from mcts_tree import MCTSNode
 
 INF = float('inf')
 # optional flags for visualization customization
@@ -144,6 +155,418 @@ def RandChoice(initial_state : GameStateNode,
     # (best action to take from initial_state, leaf statenode of best/expected path, expected utility of best action (i.e. initial_state))
 
 
+def materialize_leaf(initial_state : GameStateNode, leaf_line : Optional[Sequence[GameAction]]) -> Optional[GameStateNode]:
+    """
+    In-place searches (make_move / unmake_move on one scratch state) track leaves
+    as the sequence of actions from initial_state. Replay that sequence to
+    build the real leaf GameStateNode, with its full path.
+    Returns None if leaf_line is None (e.g. the leaf came from a transposition table hit).
+    """
+    if leaf_line is None:
+        return None
+    leaf = initial_state
+    for action in leaf_line:
+        leaf = leaf.generate_next_state(action)
+    return leaf
+
+def make_transposition_table(transposition_table : Union[bool, TranspositionTable], maximizer : int) -> Optional[TranspositionTable]:
+    """
+    Search algorithms accept either a True/False flag or a TranspositionTable to use.
+    Returns the table a search by maximizer should use (a new one if True, None if False).
+    """
+    if isinstance(transposition_table, TranspositionTable):
+        t_table = transposition_table
+    elif transposition_table:
+        t_table = TranspositionTable()
+    else:
+        return None
+    t_table.new_search(maximizer)
+    return t_table
+
+def make_move_orderer(move_ordering : Union[bool, MoveOrderer], counter : Dict) -> Optional[MoveOrderer]:
+    """
+    Search algorithms accept either a True/False flag or a MoveOrderer to use.
+    Returns the orderer a search should use (a new one if True, None if False),
+    and adds its cutoff stats to the counter: 'num_cutoffs' (beta cutoffs), and
+    'num_first_move_cutoffs' (cutoffs caused by the first move searched - ideally, most of them).
+    """
+    if isinstance(move_ordering, MoveOrderer):
+        move_orderer = move_ordering
+    elif move_ordering:
+        move_orderer = MoveOrderer()
+    else:
+        return None
+    move_orderer.new_search()
+    # Progressive counters are lists (total first, then per iteration)
+    for count in ('num_cutoffs', 'num_first_move_cutoffs'):
+        counter.setdefault(count, [0] if isinstance(counter['num_nodes_seen'], list) else 0)
+    return move_orderer
+
+def bound_flag(value : Union[int, float], alpha : Union[int, float], beta : Union[int, float]) -> int:
+    """
+    What a value found by searching with the window (alpha, beta) says about the true value:
+    UPPER if it failed low (true value <= value), LOWER if it failed high (true value >= value),
+    and EXACT otherwise.
+    """
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
+
+### Search engine #################################################
+
+""" Node policies: how an interior node's value is found from its children's values. """
+MAX_NODE = 'max'        # the best child for the maximizer
+MIN_NODE = 'min'        # the worst child for the maximizer
+CHANCE_NODE = 'chance'  # the average of the children (all actions equally likely)
+
+class GameTreeSearch:
+    """
+    The one depth-first search engine behind MaximizingDFS, MinimaxSearch, ExpectimaxSearch,
+    MinimaxAlphaBetaSearch and ProgressiveDeepening, which differ only in the options given here:
+
+    The maximizer's nodes are always MAX_NODEs; opponent_policy is the policy of all the other
+    players' nodes. Values are always from the maximizer's perspective, but MAX_NODEs and MIN_NODEs
+    are folded negamax-style, as one loop comparing sign * value.
+
+    If prune is True, the search keeps an (alpha, beta) window and prunes (alpha-beta),
+    optionally with pvs (principal variation search, see ProgressiveDeepening),
+    move_ordering (see MinimaxAlphaBetaSearch) and table_move_first (search the best move
+    stored in the transposition table first, when there is no MoveOrderer).
+
+    If chance_bounds (lowest, highest) bounds every utility and evaluation, CHANCE_NODEs
+    are pruned too when pruning (Star1, see ExpectimaxSearch), and if star2, probed first (Star2).
+
+    If deadline (a DeadlineChecker) is given, the search terminates once it is up.
+    It is checked once per node seen, so its max_calls is a node budget.
+
+    maximizer is the player whose utility is maximized - by default the player to move
+    at initial_state, but e.g. a parallel search of a subtree keeps the root's maximizer.
+
+    One GameTreeSearch can run several searches (e.g. the iterations of ProgressiveDeepening),
+    sharing its transposition table and MoveOrderer. Counters may be ints, or lists of
+    (total, then per iteration) counts, in which case both the total and the last count are updated.
+    """
+    def __init__(self, initial_state : GameStateNode,
+            util_fn : Callable[[GameStateNode, int],Union[int,float]],
+            eval_fn : Callable[[GameStateNode, int],Union[int,float]] = always_zero,
+            state_callback_fn : Callable[[GameStateNode,Union[int,float,None]],bool] = lambda state, state_value : False,
+            counter : Dict = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0},
+            opponent_policy : str = MIN_NODE,
+            prune : bool = False,
+            random_move_order : bool = False,
+            transposition_table : Union[bool, TranspositionTable] = False,
+            in_place : bool = False,
+            move_ordering : Union[bool, MoveOrderer] = False,
+            pvs : bool = False,
+            table_move_first : bool = False,
+            chance_bounds : Optional[Tuple[Union[int, float], Union[int, float]]] = None,
+            star2 : bool = False,
+            deadline : Optional[DeadlineChecker] = None,
+            maximizer : Optional[int] = None):
+        self.initial_state = initial_state
+        self.util_fn = util_fn
+        self.eval_fn = eval_fn
+        self.state_callback_fn = state_callback_fn
+        self.counter = counter
+        self.opponent_policy = opponent_policy
+        self.prune = prune
+        self.random_move_order = random_move_order
+        self.in_place = in_place
+        self.pvs = pvs
+        self.table_move_first = table_move_first
+        self.chance_bounds = chance_bounds
+        self.star2 = star2
+        self.deadline = deadline
+        self.maximizer = initial_state.get_current_player() if maximizer is None else maximizer
+        self.t_table = make_transposition_table(transposition_table, self.maximizer)
+        self.move_orderer = make_move_orderer(move_ordering, counter)
+        if pvs:
+            counter.setdefault('num_pvs_researches', [0] if isinstance(counter['num_nodes_seen'], list) else 0)
+        if prune and chance_bounds is not None:
+            # Chance nodes cut off by each phase, and their children left unsearched (or only probed)
+            star_counts = ['num_star1_cutoffs', 'num_pruned_chance_children']
+            if star2:
+                star_counts += ['num_star2_cutoffs', 'num_star2_probes']
+            for count in star_counts:
+                counter.setdefault(count, [0] if isinstance(counter['num_nodes_seen'], list) else 0)
+        # How many values in the last search came from depth-limited results (heuristic evals,
+        # or table entries that weren't searched to the end). 0 means the game tree was exhausted.
+        self.num_depth_limited = 0
+
+    def search(self, cutoff : Union[int, float] = INF,
+            alpha : Union[int, float] = -INF, beta : Union[int, float] = INF
+            ) -> Tuple[Optional[GameAction], Optional[GameStateNode], Union[int,float], bool]:
+        """
+        Search from initial_state to the cutoff depth within the (alpha, beta) window
+        (ignored unless pruning), returning the 4-tuple of the Part 1 and Part 2 algorithms.
+        """
+        # Everything the recursion uses is a local of this call, so the helper reads
+        # closure cells instead of attributes
+        initial_state, util_fn, eval_fn = self.initial_state, self.util_fn, self.eval_fn
+        state_callback_fn, counter, maximizer = self.state_callback_fn, self.counter, self.maximizer
+        opponent_policy, prune, random_move_order = self.opponent_policy, self.prune, self.random_move_order
+        in_place, pvs, deadline = self.in_place, self.pvs, self.deadline
+        t_table, move_orderer = self.t_table, self.move_orderer
+        table_move_first = self.table_move_first and t_table is not None and move_orderer is None
+        chance_bounds = self.chance_bounds if prune else None
+        star2 = self.star2
+        custom_move_ordering = move_orderer is not None
+        num_depth_limited = 0
+
+        if isinstance(counter['num_nodes_seen'], list):
+            def tally(count, amount = 1):
+                counts = counter[count]
+                counts[0] += amount
+                counts[-1] += amount
+        else:
+            def tally(count, amount = 1):
+                counter[count] += amount
+
+        if in_place:
+            # The scratch state keeps changing, so it can't be a returned leaf; track action paths instead.
+            root_state = initial_state.clone_detached()
+            line = []
+        else:
+            root_state = initial_state
+
+        def search_child(state, action, ply, _alpha_, _beta_):
+            """ Search the child of state reached by action (in place, or as a new node) """
+            if in_place:
+                # Step the scratch state down, search, then step back up
+                state.make_move(action)
+                line.append(action)
+                result = search_helper(state, ply + 1, _alpha_, _beta_)
+                line.pop()
+                state.unmake_move()
+                return result
+            return search_helper(state.generate_next_state(action), ply + 1, _alpha_, _beta_)
+
+        def search_star_chance(state, all_actions, ply, _alpha_, _beta_):
+            """
+            Value a CHANCE_NODE within the (alpha, beta) window by Star1 pruning (Ballard's *-minimax):
+            every value lies within chance_bounds, so once the children searched so far put the average
+            outside the window whatever the rest are, the rest are skipped, and the value is just a bound.
+            With star2, first probe each of the maximizer's children by searching only its first move,
+            which bounds the child's value from below; if those bounds already average at least beta,
+            the node fails high without fully searching any child.
+            Returns the value and whether terminated.
+            """
+            lower, upper = chance_bounds
+            num_actions = len(all_actions)
+            # The window on the sum of the children's values
+            sum_alpha, sum_beta = num_actions * _alpha_, num_actions * _beta_
+            # Lower bounds on each child's value
+            child_lowers = [lower] * num_actions
+            terminated = False
+
+            if star2 and sum_beta < INF:
+                sum_probed = 0
+                for index, action in enumerate(all_actions):
+                    # Unless this child's lower bound is at least probe_alpha, they can't add up to beta
+                    probe_alpha = sum_beta - sum_probed - (num_actions - index - 1) * upper
+                    if probe_alpha > upper:
+                        break
+                    if in_place:
+                        state.make_move(action)
+                        line.append(action)
+                        child = state
+                    else:
+                        child = state.generate_next_state(action)
+                    if ply + 1 < cutoff and child.get_current_player() == maximizer and not child.is_endgame_state():
+                        tally('num_star2_probes')
+                        first_action = child.get_all_actions(custom_move_ordering = custom_move_ordering)[0]
+                        probe_window = (max(probe_alpha, lower), upper)
+                        _, _, probe_util, terminated = search_child(child, first_action, ply + 1, *probe_window)
+                        # (Unless it failed low, the probe's value is a lower bound on its own)
+                        if probe_util > probe_window[0]:
+                            child_lowers[index] = probe_util
+                    if in_place:
+                        line.pop()
+                        state.unmake_move()
+                    if terminated:
+                        return (sum_probed + child_lowers[index]) / (index + 1), terminated
+                    sum_probed += child_lowers[index]
+                    if child_lowers[index] < probe_alpha:
+                        break
+                else:
+                    tally('num_star2_cutoffs')
+                    tally('num_pruned_chance_children', num_actions)
+                    return sum_probed / num_actions, terminated
+
+            sum_util = 0
+            # The lower bounds of the children not yet searched
+            sum_lowers_left = sum(child_lowers)
+            for index, action in enumerate(all_actions):
+                sum_lowers_left -= child_lowers[index]
+                num_left = num_actions - index - 1
+                # The child values that would leave the sum's window out of reach either way
+                child_alpha = sum_alpha - sum_util - num_left * upper
+                child_beta = sum_beta - sum_util - sum_lowers_left
+                _, _, exp_util, terminated = search_child(state, action, ply, max(child_alpha, lower), min(child_beta, upper))
+                sum_util += exp_util
+
+                # Visualize mid-expansion, now with partial updated utility!
+                if VIS_MID:
+                    terminated = state_callback_fn(state, sum_util / (index + 1))
+                if terminated : # early termination - dont go down more branches
+                    break
+
+                if exp_util <= child_alpha or exp_util >= child_beta:
+                    # The value is only a bound (upper if failing low, lower if failing high)
+                    if num_left > 0:
+                        tally('num_star1_cutoffs')
+                        tally('num_pruned_chance_children', num_left)
+                    return (sum_util + (num_left * upper if exp_util <= child_alpha else sum_lowers_left)) / num_actions, terminated
+            return sum_util / num_actions, terminated
+
+        # A recursive helper function.
+        # Has access to all the parameters of the outer function,
+        # avoids excessive passing of unchanging parameters
+        def search_helper(state, ply, _alpha_, _beta_):
+            nonlocal num_depth_limited
+            tally('num_nodes_seen')
+            if t_table is not None:
+                # Stored exact values, or bounds that fall outside the window, can stand in for a search
+                # (never at the root, which must still find its best action)
+                state_key = hash(state)
+                depth_left = cutoff - ply
+                stored_entry = t_table.probe_entry(state_key, depth_left, _alpha_, _beta_) if ply > 0 else None
+                if stored_entry is not None:
+                    if stored_entry.depth != INF:
+                        num_depth_limited += 1
+                    terminated = state_callback_fn(state, stored_entry.value) if VIS_POST else False
+                    if deadline is not None and deadline.time_up():
+                        terminated = True
+                    return None, None, stored_entry.value, terminated #could return best_leaf_node but might be funky?
+                alpha_orig, beta_orig = _alpha_, _beta_
+                num_depth_limited_before = num_depth_limited
+
+            # Base case - endgame leaf node:
+            if state.is_endgame_state() :
+                tally('num_endgame_evals')
+                endgame_util = util_fn(state, maximizer)
+                if t_table is not None:
+                    t_table.store(state_key, INF, endgame_util)
+                # Visualize leaf node with utility, check for early termination signal
+                terminated = state_callback_fn(state, endgame_util) if VIS_ENDGAME else False
+                if deadline is not None and deadline.time_up():
+                    terminated = True
+                return None, (tuple(line) if in_place else state), endgame_util, terminated
+
+            # Early cutoff evaluation:
+            if ply >= cutoff:
+                tally('num_heuristic_evals')
+                num_depth_limited += 1
+                heuristic_eval = eval_fn(state, maximizer)
+                if t_table is not None:
+                    t_table.store(state_key, depth_left, heuristic_eval)
+                # Visualize leaf node with evaluation, check for early termination signal
+                terminated = state_callback_fn(state, heuristic_eval) if VIS_CUTOFF else False
+                if deadline is not None and deadline.time_up():
+                    terminated = True
+                return None, (tuple(line) if in_place else state), heuristic_eval, terminated
+
+            # Recursive step - fold the children's values by the node's policy
+
+            # Visualize on downwards traversal.
+            state_callback_fn(state,None) if VIS_PRE else False
+
+            policy = MAX_NODE if state.get_current_player() == maximizer else opponent_policy
+
+            best_action , best_leaf_node, best_exp_util, terminated = None, None, None, False
+            all_actions = state.get_all_actions(custom_move_ordering = custom_move_ordering)
+            if random_move_order:
+                random.shuffle(all_actions)
+            if move_orderer is not None:
+                all_actions = move_orderer.order_actions(state, all_actions, ply,
+                    tt_move = t_table.get_best_move(state_key) if t_table is not None else None)
+            # MOVE ORDERING BY OLD SEARCH RESULTS: try the best move stored by an earlier search first
+            elif table_move_first:
+                stored_best_action = t_table.get_best_move(state_key)
+                if stored_best_action is not None and stored_best_action in all_actions:
+                    all_actions.remove(stored_best_action)
+                    all_actions.insert(0, stored_best_action)
+
+            if policy is CHANCE_NODE and chance_bounds is not None:
+                # we'll return None for best_leaf_node and best_action, since no single path is expected.
+                best_exp_util, terminated = search_star_chance(state, all_actions, ply, _alpha_, _beta_)
+
+            elif policy is CHANCE_NODE:
+                # we'll return None for best_leaf_node and best_action, since no single path is expected.
+                sum_util = 0
+                for index, action in enumerate(all_actions):
+                    _, _, exp_util, terminated = search_child(state, action, ply, _alpha_, _beta_)
+                    sum_util += exp_util
+
+                    # Visualize mid-expansion, now with partial updated utility!
+                    if VIS_MID:
+                        terminated = state_callback_fn(state, sum_util / (index + 1))
+                    if terminated : # early termination - dont go down more branches
+                        break
+                # best_exp_util is really average expected utility
+                best_exp_util = sum_util / len(all_actions)
+
+            else:
+                sign = 1 if policy is MAX_NODE else -1
+                for index, action in enumerate(all_actions):
+                    if pvs and index > 0:
+                        # Null window just above alpha (maximizing) / below beta (minimizing):
+                        # the result is either "no better than the best so far" or a bound showing it is better
+                        if sign > 0:
+                            null_alpha, null_beta = _alpha_, math.nextafter(_alpha_, INF)
+                        else:
+                            null_alpha, null_beta = math.nextafter(_beta_, -INF), _beta_
+                        child_action, leaf_node, exp_util, terminated = search_child(state, action, ply, null_alpha, null_beta)
+                        if not terminated and _alpha_ < exp_util < _beta_:
+                            tally('num_pvs_researches')
+                            child_action, leaf_node, exp_util, terminated = search_child(state, action, ply, _alpha_, _beta_)
+                    else:
+                        child_action, leaf_node, exp_util, terminated = search_child(state, action, ply, _alpha_, _beta_)
+
+                    if best_exp_util == None or sign * exp_util > sign * best_exp_util:
+                        best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util
+                        if prune:
+                            if sign > 0:
+                                _alpha_ = max(best_exp_util, _alpha_)
+                            else:
+                                _beta_ = min(best_exp_util, _beta_)
+
+                    # Visualize mid-expansion, now with partial updated utility!
+                    if VIS_MID:
+                        terminated = state_callback_fn(state, best_exp_util)
+                    if terminated : # early termination - dont go down more branches
+                        break
+
+                    if prune and _alpha_ >= _beta_:
+                        if move_orderer is not None:
+                            move_orderer.record_cutoff(state, action, ply, cutoff - ply)
+                            tally('num_cutoffs')
+                            if index == 0:
+                                tally('num_first_move_cutoffs')
+                        break
+
+            if t_table is not None and not terminated: # CAREFUL - don't store a partially searched value
+                # After a cutoff the value is only a bound on the true value.
+                # A subtree searched all the way to endgame states holds at any depth (e.g. in later searches)
+                searched_depth = INF if num_depth_limited == num_depth_limited_before else depth_left
+                flag = bound_flag(best_exp_util, alpha_orig, beta_orig) if prune else EXACT
+                t_table.store(state_key, searched_depth, best_exp_util, flag, best_action)
+            # Visualize on upwards traversal, now with fully updated utility!
+            terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
+            if deadline is not None and deadline.time_up():
+                terminated = True
+            return best_action , best_leaf_node, best_exp_util, terminated
+            ### End of recursive helper function ###
+
+        # Simply call the helper function on the initial_state.
+        best_action, best_leaf_node, best_exp_util, terminated = search_helper(root_state, 0, alpha, beta)
+        self.num_depth_limited = num_depth_limited
+        if in_place:
+            best_leaf_node = materialize_leaf(initial_state, best_leaf_node)
+        return best_action, best_leaf_node, best_exp_util, terminated
+
 ### Part 1: Searching the game tree  #################################################
 
 """
@@ -193,6 +616,15 @@ transposition_table: A True/False flag indicating whether or not a transposition
     table should be used. For Part 1 you may ignore this parameter, but Part 2
     requires that each algorithm address this. You may, of course, implement it early
     for Part 1 submission, though it will not be tested.
+    May also be a TranspositionTable object, which is used (and kept filled) instead
+    of a new table.
+
+in_place: A True/False flag. If true, the search walks one scratch copy of initial_state
+    with make_move / unmake_move instead of generating a new node per edge
+    (see MinimaxAlphaBetaSearch).
+
+All of these algorithms are run by the one GameTreeSearch engine above;
+each only chooses its node policies and options.
 
 Returns the following 4-tuple.
     1) The "best" action to take from initial_state.
@@ -209,89 +641,21 @@ def MaximizingDFS(initial_state : GameStateNode,
     state_callback_fn : Callable[[GameStateNode,Union[int,float,None]],bool] = lambda state, state_value : False,
     counter : Dict[str,int] = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
     random_move_order : bool = False,     # If true, consider moves in random order 
-    transposition_table : bool = False    # If true, use a transposition table. [IGNORE until Part 2]
+    transposition_table : bool = False,    # If true, use a transposition table. [IGNORE until Part 2]
+    in_place : bool = False    # If true, walk a single scratch state with make_move / unmake_move
     ):
     """
     Searches down ALL paths of the game tree, performing Maximizing Depth First Search
     Both players are modeled as maximizing the utility for the first player.
     This could be interpreted as an optimistic model of your opponents behavior.
     """
-    if transposition_table:
-        t_table = {}
 
-    maximizer = initial_state.get_current_player()
-
-    # A recursive helper function.
-    # Has access to all the parameters of the outer function,
-    # avoids excessive passing of unchanging parameters
-    def MaximizingDFS_helper(state):
-        counter['num_nodes_seen'] += 1
-        if transposition_table and state in t_table:
-            best_leaf_node, best_exp_util = t_table[state]
-            terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-            return None, None, best_exp_util, terminated #could return best_leaf_node but might be funky?
-
-        # Base case - endgame leaf node:
-        if state.is_endgame_state() :
-            counter['num_endgame_evals'] += 1
-            endgame_util = util_fn(state, maximizer)
-            # Visualize leaf node with utility, check for early termination signal
-            if transposition_table:
-                t_table[state] =  state, endgame_util
-            terminated = state_callback_fn(state, endgame_util) if VIS_ENDGAME else False
-            return None, state, endgame_util, terminated
-
-        # Early cutoff evaluation:
-        if state.get_path_length() - initial_state.get_path_length() >= cutoff:
-            counter['num_heuristic_evals'] += 1
-            heuristic_eval = eval_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, heuristic_eval
-
-            # Visualize leaf node with evaluation, check for early termination signal
-            terminated = state_callback_fn(state, heuristic_eval) if VIS_CUTOFF else False
-
-            return None, state, heuristic_eval, terminated
-
-        # Recursive step - maximize expected utility amongst actions
-        # This is expanding!
-        maximize = (maximizer == state.get_current_player())
-
-        # Visualize on downwards traversal.
-        state_callback_fn(state,None) if VIS_PRE else False
-
-        best_action , best_leaf_node, best_exp_util, terminated = None, None, None, False
-        all_actions = state.get_all_actions()
-        if random_move_order:
-            random.shuffle(all_actions)
-        for action in all_actions:
-            # What child state results from that action?
-            child_state = state.generate_next_state(action)
-            # Recursively Search from the child_state
-            child_action, leaf_node, exp_util, terminated = MaximizingDFS_helper(child_state)
-
-            if best_exp_util == None or (exp_util > best_exp_util):
-                best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util,
-
-            # Visualize mid-expansion, now with partial updated utility!
-            if VIS_MID:
-                terminated = state_callback_fn(state, best_exp_util)
-            if terminated : # early termination - dont go down more branches
-                break
-
-        # Visualize on upwards traversal, now with fully updated utility!
-        if transposition_table:
-            t_table[state] = best_leaf_node, best_exp_util
-        terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-
-        return best_action , best_leaf_node, best_exp_util, terminated
-        ### End of recursive helper function ###
-
-
-    # Simply call the helper function on the initial_state.
-    return MaximizingDFS_helper(initial_state)
-    #     return (None, None, 0, False)
-    return None, None, 0, False
+    # Both players' nodes are MAX_NODEs
+    return GameTreeSearch(initial_state, util_fn, eval_fn, state_callback_fn, counter,
+        opponent_policy = MAX_NODE,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place).search(cutoff)
 
 def MinimaxSearch(initial_state,
     util_fn,
@@ -300,7 +664,8 @@ def MinimaxSearch(initial_state,
     state_callback_fn = lambda state, state_value : False, # A callback function for the GUI. If it returns True, terminate
     counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
     random_move_order = False,     # If true, consider moves in random order
-    transposition_table = False    # If true, use a transposition table. [IGNORE until Part 2]
+    transposition_table = False,    # If true, use a transposition table. [IGNORE until Part 2]
+    in_place = False    # If true, walk a single scratch state with make_move / unmake_move
     ):
     """
     Searches down ALL paths of the game tree, performing Minimax.
@@ -308,75 +673,11 @@ def MinimaxSearch(initial_state,
     or maximizing / minimizing the first player (maximizer)'s utility.
     This could be interpreted as a pessimistic model of your opponents behavior.
     """
-    if transposition_table:
-        t_table = {}
-    maximizer = initial_state.get_current_player()
-
-    # A recursive helper function.
-    # Has access to all the parameters of the outer function,
-    # avoids excessive passing of unchanging parameters
-    def MinimaxSearch_helper(state):
-        counter['num_nodes_seen'] += 1
-        if transposition_table and state in t_table:
-            best_leaf_node, best_exp_util = t_table[state]
-            terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-            return None, None, best_exp_util, terminated #could return best_leaf_node but might be funky?
-        is_maximizer = state.get_current_player() == maximizer
-
-        # Base case - endgame leaf node:
-        if state.is_endgame_state() :
-            counter['num_endgame_evals'] += 1
-            endgame_util = util_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, endgame_util
-            # Visualize leaf node with utility, check for early termination signal
-            terminated = state_callback_fn(state, endgame_util) if VIS_ENDGAME else False
-            return None, state, endgame_util, terminated
-
-        # Early cutoff evaluation:
-        if state.get_path_length() - initial_state.get_path_length() >= cutoff:
-            counter['num_heuristic_evals'] += 1
-            heuristic_eval = eval_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, heuristic_eval
-            # Visualize leaf node with evaluation, check for early termination signal
-            terminated = state_callback_fn(state, heuristic_eval) if VIS_CUTOFF else False
-
-            return None, state, heuristic_eval, terminated
-
-        # Recursive step - maximize expected utility amongst actions
-        # This is expanding!
-        maximize = (maximizer == state.get_current_player())
-        # Visualize on downwards traversal.
-        state_callback_fn(state,None) if VIS_PRE else False
-
-        best_action , best_leaf_node, best_exp_util, terminated = None, None, None, False
-        all_actions = state.get_all_actions()
-        if random_move_order:
-            random.shuffle(all_actions)
-        for action in all_actions:
-            # What child state results from that action?
-            child_state = state.generate_next_state(action)
-            # Recursively Search from the child_state
-            child_action, leaf_node, exp_util, terminated = MinimaxSearch_helper(child_state)
-
-            if best_exp_util == None or (exp_util > best_exp_util if maximize else exp_util < best_exp_util):
-                best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util,
-
-            # Visualize mid-expansion, now with partial updated utility!
-            if VIS_MID:
-                terminated = state_callback_fn(state, best_exp_util)
-            if terminated : # early termination - dont go down more branches
-                break
-
-        # Visualize on upwards traversal, now with fully updated utility!
-        if transposition_table:
-            t_table[state] = best_leaf_node, best_exp_util
-        terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-        return best_action, best_leaf_node, best_exp_util, terminated #could return best_leaf_node but might be funky?        ### End of recursive helper function ###
-
-    # Simply call the helper function on the initial_state.
-    return MinimaxSearch_helper(initial_state)
+    return GameTreeSearch(initial_state, util_fn, eval_fn, state_callback_fn, counter,
+        opponent_policy = MIN_NODE,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place).search(cutoff)
 
 
 def ExpectimaxSearch(initial_state,
@@ -386,7 +687,11 @@ def ExpectimaxSearch(initial_state,
     state_callback_fn = lambda state, state_value : False, # A callback function for the GUI. If it returns True, terminate
     counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
     random_move_order = False,     # If true, consider moves in random order
-    transposition_table = False    # If true, use a transposition table. [IGNORE until Part 2]
+    transposition_table = False,    # If true, use a transposition table. [IGNORE until Part 2]
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    star_pruning = False,    # If true, prune the tree with Star1 (bounded expectimax) - needs utility_bounds
+    star2 = False,    # If true (and star_pruning), probe the opponent's nodes before searching them (Star2)
+    utility_bounds = None    # (lowest, highest) values of util_fn and eval_fn. By default, from get_value_bounds
     ):
     """
     Searches down ALL paths of the game tree, performing Expectimax.
@@ -398,102 +703,41 @@ def ExpectimaxSearch(initial_state,
 
     Since there is no single leaf node that represents the expected outcome,
     return None for the second return value.
-    """
-    if transposition_table:
-        t_table = {}
-    maximizer = initial_state.get_current_player()
-
-    # A recursive helper function.
-    # Has access to all the parameters of the outer function,
-    # avoids excessive passing of unchanging parameters
-    def Expectimax_helper(state):
-        counter['num_nodes_seen'] += 1
-        if transposition_table and state in t_table:
-            best_leaf_node, best_exp_util = t_table[state]
-            terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-            return None, None, best_exp_util, terminated #could return best_leaf_node but might be funky?
-
-        is_maximizer = state.get_current_player() == maximizer
-
-        # Base case - endgame leaf node:
-        if state.is_endgame_state() :
-            counter['num_endgame_evals'] += 1
-            endgame_util = util_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, endgame_util
-            # Visualize leaf node with utility, check for early termination signal
-            terminated = state_callback_fn(state, endgame_util) if VIS_ENDGAME else False
-            return None, state, endgame_util, terminated
-
-        # Early cutoff evaluation:
-        if state.get_path_length() - initial_state.get_path_length() >= cutoff:
-            counter['num_heuristic_evals'] += 1
-            heuristic_eval = eval_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, heuristic_eval
-            # Visualize leaf node with evaluation, check for early termination signal
-            terminated = state_callback_fn(state, heuristic_eval) if VIS_CUTOFF else False
-
-            return None, state, heuristic_eval, terminated
-
-        # Recursive step - maximize expected utility amongst actions
-        # This is expanding!
-        maximize = (maximizer == state.get_current_player())
-        # Visualize on downwards traversal.
-        state_callback_fn(state,None) if VIS_PRE else False
 
-        best_action , best_leaf_node, best_exp_util, terminated = None, None, None, False
-
-
-        if maximize:
-            all_actions = state.get_all_actions()
-            if random_move_order:
-                random.shuffle(all_actions)
-            for action in all_actions:
-                # What child state results from that action?
-                child_state = state.generate_next_state(action)
-                # Recursively Search from the child_state
-                child_action, leaf_node, exp_util, terminated = Expectimax_helper(child_state)
-
-                if best_exp_util == None or (exp_util > best_exp_util):
-                    best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util,
-
-                # Visualize mid-expansion, now with partial updated utility!
-                if VIS_MID:
-                    terminated = state_callback_fn(state, best_exp_util)
-                if terminated : # early termination - dont go down more branches
-                    break
-
-        else: #uniform average instead of min
-            # we'll return None for best_leaf_node and best_action, since we're not concerned about that.
-            sum_util  = 0
-            all_actions = state.get_all_actions()
-            for action in all_actions:
-                # What child state results from that action?
-                child_state = state.generate_next_state(action)
-                # Recursively Search from the child_state
-                _, _, exp_util, terminated = Expectimax_helper(child_state)
-                sum_util += exp_util
-
-                # Visualize mid-expansion, now with partial updated utility!
-                if VIS_MID:
-                    terminated = state_callback_fn(state, best_exp_util)
-                if terminated : # early termination - dont go down more branches
-                    break
-
-            # best_exp_util is really average expected utility
-            best_exp_util = sum_util / len(all_actions)
-
-        # Visualize on upwards traversal, now with fully updated utility!
-        if transposition_table:
-            t_table[state] = best_leaf_node, best_exp_util
-        terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-        return best_action , None, best_exp_util, terminated
-        ### End of recursive helper function ###
-
-    # Simply call the helper function on the initial_state.
-    return Expectimax_helper(initial_state)
-    #     return (None, None, 0, False)
+    With star_pruning, it is bounded expectimax: since every value lies within utility_bounds,
+    an average node can be cut off once the children searched so far pin its average below what
+    the maximizer is already sure of (or above what it can get), as alpha-beta cuts off min nodes.
+    The value found is the same. Unless utility_bounds are given, they are looked up for util_fn
+    and eval_fn; if they aren't known, there is no pruning.
+    counter['num_pruned_chance_children'] counts the children of average nodes left unsearched.
+    """
+    if utility_bounds is None and star_pruning:
+        utility_bounds = get_value_bounds(util_fn, eval_fn)
+    prune = star_pruning and utility_bounds is not None
+    best_action, best_leaf_node, best_exp_util, terminated = GameTreeSearch(
+        initial_state, util_fn, eval_fn, state_callback_fn, counter,
+        opponent_policy = CHANCE_NODE,
+        prune = prune,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place,
+        chance_bounds = utility_bounds if prune else None,
+        star2 = star2).search(cutoff)
+    return best_action, None, best_exp_util, terminated
+
+def Star2ExpectimaxSearch(initial_state,
+    util_fn,
+    eval_fn = always_zero,
+    cutoff = INF,
+    state_callback_fn = lambda state, state_value : False, # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
+    random_move_order = False,     # If true, consider moves in random order
+    transposition_table = False,    # If true, use a transposition table.
+    in_place = False    # If true, walk a single scratch state with make_move / unmake_move
+    ):
+    """ ExpectimaxSearch with Star1 and Star2 pruning (for the GUIs' algorithm menus) """
+    return ExpectimaxSearch(initial_state, util_fn, eval_fn, cutoff, state_callback_fn, counter,
+        random_move_order, transposition_table, in_place, star_pruning = True, star2 = True)
 
 ### Part 2: Pruning the tree - Transposition Tables, Alpha-Beta Pruning, Move ordering #################################################
 
@@ -528,6 +772,8 @@ may be many, many states to remember! In practice, transposition tables are usua
 limited with some replacement scheme to estimate which stored states are least useful and
 safe to replace. However, you do not need to implement any such size
 limitation or replacement scheme in this lab.
+(TranspositionTable in transposition_table.py is one such size-limited table,
+keyed by state hashes, with depth-preferred / always-replace slots.)
 
 NOTE:
     If using a transposition table, you may return None for
@@ -587,6 +833,8 @@ def MinimaxAlphaBetaSearch(initial_state,
     counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
     random_move_order = False,     # If true, consider moves in random order
     transposition_table = False,    # If true, use a transposition table.
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    move_ordering = False,    # If true (or a MoveOrderer), order moves by table move, killer moves and history
     ):
     """
     Searches SOME branches of the game tree by performing Minimax with alpha-beta pruning.
@@ -596,92 +844,192 @@ def MinimaxAlphaBetaSearch(initial_state,
     Again, both players are modeled as either maximizing the utility for themselves,
     or maximizing / minimizing the first player (maximizer)'s utility.
     This could be interpreted as a pessimistic model of your opponents behavior.
+
+    If in_place is True, no node is created per edge: the search walks one
+    scratch copy of initial_state with make_move / unmake_move, and the
+    best leaf node is only materialized (by replaying its actions) at the end.
+
+    If move_ordering is True (or a MoveOrderer), moves start in the game's custom order,
+    then are reordered by the MoveOrderer (see move_ordering.py).
+    """
+
+    return GameTreeSearch(initial_state, util_fn, eval_fn, state_callback_fn, counter,
+        opponent_policy = MIN_NODE,
+        prune = True,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place,
+        move_ordering = move_ordering).search(cutoff)
+
+class SearchFrame:
+    """
+    The state of one interior node in an explicit-stack (non-recursive) search:
+    the state, its actions and which one is being searched, its window and its best result so far.
+    Frames are reused by every node at the same ply, instead of a call frame per node.
     """
+    __slots__ = ('state', 'actions', 'index', 'alpha', 'beta', 'alpha_orig', 'beta_orig', 'maximize',
+                 'best_action', 'best_leaf_node', 'best_exp_util',
+                 'state_key', 'depth_left', 'num_depth_limited_before')
 
+def MinimaxAlphaBetaSearchIterative(initial_state,
+    util_fn,
+    eval_fn = always_zero,
+    cutoff = INF,
+    state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
+    random_move_order = False,     # If true, consider moves in random order
+    transposition_table = False,    # If true, use a transposition table.
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    move_ordering = False,    # If true (or a MoveOrderer), order moves by table move, killer moves and history
+    ):
+    """
+    The same search as MinimaxAlphaBetaSearch (same parameters, same 4-tuple result,
+    same node order and counts), but without recursion: each ply's node is kept in a
+    SearchFrame on an explicit stack, and the frames are reused across the search.
+
+    So there is no recursion limit on how deep the search can go (e.g. an unlimited cutoff
+    on a large Roomba maze), and no Python call overhead per node.
+    """
     maximizer = initial_state.get_current_player()
-    if transposition_table:
-        t_table = {}
-    # A recursive helper function.
-    # Has access to all the parameters of the outer function,
-    # avoids excessive passing of unchanging parameters
-    def MinimaxAlphaBetaSearch_helper(state, _alpha_, _beta_):
+    t_table = make_transposition_table(transposition_table, maximizer)
+    move_orderer = make_move_orderer(move_ordering, counter)
+    num_depth_limited = 0
+    if in_place:
+        # The scratch state keeps changing, so it can't be a returned leaf; track action paths instead.
+        state = initial_state.clone_detached()
+        line = []
+    else:
+        state = initial_state
+
+    frames = [SearchFrame() for _ in range(int(min(cutoff, 64)))] # grown as needed
+    depth = 0 # number of frames in use, i.e. the ply of the state being entered
+    _alpha_, _beta_ = -INF, INF
+
+    while True:
+        # Enter state: a leaf (or table hit) gives a result right away, an interior node pushes a frame.
         counter['num_nodes_seen'] += 1
-        if transposition_table and state in t_table:
-            best_leaf_node, best_exp_util = t_table[state]
-            terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-            return None, None, best_exp_util, terminated #could return best_leaf_node but might be funky?
-        is_maximizer = state.get_current_player() == maximizer
+        has_result = True
+        leaf_node, exp_util, terminated = None, None, False
+        stored_entry = None
+        if t_table is not None:
+            state_key = hash(state)
+            depth_left = cutoff - depth
+            # (never at the root, which must still find its best action)
+            stored_entry = t_table.probe_entry(state_key, depth_left, _alpha_, _beta_) if depth > 0 else None
+        if stored_entry is not None:
+            if stored_entry.depth != INF:
+                num_depth_limited += 1
+            exp_util = stored_entry.value
+            terminated = state_callback_fn(state, exp_util) if VIS_POST else False
 
         # Base case - endgame leaf node:
-        if state.is_endgame_state() :
+        elif state.is_endgame_state() :
             counter['num_endgame_evals'] += 1
-            endgame_util = util_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, endgame_util
+            exp_util = util_fn(state, maximizer)
+            if t_table is not None:
+                t_table.store(state_key, INF, exp_util)
             # Visualize leaf node with utility, check for early termination signal
-            terminated = state_callback_fn(state, endgame_util) if VIS_ENDGAME else False
-            return None, state, endgame_util, terminated
+            terminated = state_callback_fn(state, exp_util) if VIS_ENDGAME else False
+            leaf_node = tuple(line) if in_place else state
 
         # Early cutoff evaluation:
-        if state.get_path_length() - initial_state.get_path_length() >= cutoff:
+        elif depth >= cutoff:
             counter['num_heuristic_evals'] += 1
-            heuristic_eval = eval_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, heuristic_eval
+            num_depth_limited += 1
+            exp_util = eval_fn(state, maximizer)
+            if t_table is not None:
+                t_table.store(state_key, depth_left, exp_util)
             # Visualize leaf node with evaluation, check for early termination signal
-            terminated = state_callback_fn(state, heuristic_eval) if VIS_CUTOFF else False
-
-            return None, state, heuristic_eval, terminated
-
-        # Recursive step - maximize expected utility amongst actions
-
-        # Visualize on downwards traversal.
-        state_callback_fn(state,None) if VIS_PRE else False
-
-        maximize = (maximizer == state.get_current_player())
-
-        best_action , best_leaf_node, best_exp_util, terminated = None, None, None, False
-        all_actions = state.get_all_actions()
-        if random_move_order:
-            random.shuffle(all_actions)
-        for action in all_actions:
-            # What child state results from that action?
-            child_state = state.generate_next_state(action)
-            # Recursively Search from the child_state
-            child_action, leaf_node, exp_util, terminated = MinimaxAlphaBetaSearch_helper(child_state, _alpha_, _beta_)
-
-            if maximize:
-                if best_exp_util == None or exp_util > best_exp_util:
-                    best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util,
-                    _alpha_ = max(best_exp_util, _alpha_)
-            else: #minimizing
-                if best_exp_util == None or exp_util < best_exp_util:
-                    best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util,
-                    _beta_ = min(best_exp_util, _beta_)
-
-
-            # Visualize mid-expansion, now with partial updated utility!
-            if VIS_MID:
-                terminated = state_callback_fn(state, best_exp_util)
-            if terminated : # early termination - dont go down more branches
-                break
+            terminated = state_callback_fn(state, exp_util) if VIS_CUTOFF else False
+            leaf_node = tuple(line) if in_place else state
+
+        # Interior node - push a frame for it
+        else:
+            # Visualize on downwards traversal.
+            state_callback_fn(state,None) if VIS_PRE else False
+            if depth == len(frames):
+                frames.append(SearchFrame())
+            frame = frames[depth]
+            depth += 1
+            frame.state = state
+            all_actions = state.get_all_actions(custom_move_ordering = move_orderer is not None)
+            if random_move_order:
+                random.shuffle(all_actions)
+            if move_orderer is not None:
+                all_actions = move_orderer.order_actions(state, all_actions, depth - 1,
+                    tt_move = t_table.get_best_move(state_key) if t_table is not None else None)
+            frame.actions = all_actions
+            frame.index = 0
+            frame.alpha, frame.beta = _alpha_, _beta_
+            frame.alpha_orig, frame.beta_orig = _alpha_, _beta_
+            frame.maximize = (maximizer == state.get_current_player())
+            frame.best_action, frame.best_leaf_node, frame.best_exp_util = None, None, None
+            if t_table is not None:
+                frame.state_key, frame.depth_left = state_key, depth_left
+                frame.num_depth_limited_before = num_depth_limited
+            has_result = False
+
+        # Fold results up the stack until some frame has another child to search
+        while True:
+            if depth == 0: # The root itself was a leaf
+                return None, (materialize_leaf(initial_state, leaf_node) if in_place else leaf_node), exp_util, terminated
+            frame = frames[depth - 1]
+            if not has_result: # Just pushed, start on its first child
+                finished = False
+            else:
+                action = frame.actions[frame.index - 1]
+                if in_place:
+                    line.pop()
+                    frame.state.unmake_move()
+
+                if frame.maximize:
+                    if frame.best_exp_util == None or exp_util > frame.best_exp_util:
+                        frame.best_action , frame.best_leaf_node, frame.best_exp_util = action, leaf_node, exp_util
+                        frame.alpha = max(exp_util, frame.alpha)
+                else: #minimizing
+                    if frame.best_exp_util == None or exp_util < frame.best_exp_util:
+                        frame.best_action , frame.best_leaf_node, frame.best_exp_util = action, leaf_node, exp_util
+                        frame.beta = min(exp_util, frame.beta)
 
-            if _alpha_ >= _beta_:
+                # Visualize mid-expansion, now with partial updated utility!
+                if VIS_MID:
+                    terminated = state_callback_fn(frame.state, frame.best_exp_util)
+                finished = terminated or frame.index == len(frame.actions) # early termination - dont go down more branches
+                if not terminated and frame.alpha >= frame.beta:
+                    finished = True
+                    if move_orderer is not None:
+                        move_orderer.record_cutoff(frame.state, action, depth - 1, cutoff - (depth - 1))
+                        counter['num_cutoffs'] += 1
+                        if frame.index == 1:
+                            counter['num_first_move_cutoffs'] += 1
+
+            if not finished:
+                # Descend into the next child
+                action = frame.actions[frame.index]
+                frame.index += 1
+                if in_place:
+                    frame.state.make_move(action)
+                    line.append(action)
+                else:
+                    state = frame.state.generate_next_state(action)
+                _alpha_, _beta_ = frame.alpha, frame.beta
                 break
 
-        if transposition_table and not(_alpha_ >= _beta_): # CAREFUL - don't update table if unsure.
-            t_table[state] = best_leaf_node, best_exp_util
-        # Visualize on upwards traversal, now with fully updated utility!
-        terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-        return best_action , best_leaf_node, best_exp_util, terminated
-        ### End of recursive helper function ###
-
-
-    # Simply call the helper function on the initial_state.
-
-    # Simply call the helper function on the initial_state.
-    return MinimaxAlphaBetaSearch_helper(initial_state, -INF, INF)
-    #     return (None, None, 0, False)
+            # Pop the frame, its result goes to the frame above
+            if t_table is not None and not terminated:
+                # CAREFUL - after a cutoff the value is only a bound on the true value.
+                searched_depth = INF if num_depth_limited == frame.num_depth_limited_before else frame.depth_left
+                t_table.store(frame.state_key, searched_depth, frame.best_exp_util,
+                    bound_flag(frame.best_exp_util, frame.alpha_orig, frame.beta_orig), frame.best_action)
+            # Visualize on upwards traversal, now with fully updated utility!
+            terminated = state_callback_fn(frame.state, frame.best_exp_util) if VIS_POST else False
+            leaf_node, exp_util = frame.best_leaf_node, frame.best_exp_util
+            frame.state, frame.actions, frame.best_leaf_node = None, None, None
+            depth -= 1
+            has_result = True
+            if depth == 0:
+                return (frame.best_action, (materialize_leaf(initial_state, leaf_node) if in_place else leaf_node),
+                        exp_util, terminated)
 
 ### Part 3: Progressive Deepening Algorithms #################################################
 
@@ -729,143 +1077,636 @@ def ProgressiveDeepening (initial_state,
     counter = {'num_nodes_seen':[0], 'num_endgame_evals':[0], 'num_heuristic_evals':[0]}, # A counter for tracking stats
     random_move_order = False,     # If true, consider moves in random order
     transposition_table = False,
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    aspiration_window = None,    # If a number, start each iteration in a window of +/- this around the last value
+    pvs = False,    # If true, use principal variation search (null windows for all but the first child)
+    move_ordering = False,    # If true (or a MoveOrderer), order moves by table move, killer moves and history
+    max_nodes = INF,    # Stop after searching this many nodes (an exact budget, unlike time_limit)
     ):
     """
     Performs progressively deepening Minimax search w/ alpha beta pruning.
 
-    If transposition_table is true,
-    each search uses the state values calculated by previous searches
-    to reorder the moves (after randomizing move ordering, if applicable).
-    This helps explore "better" branches earlier, improving pruning.
+    The search stops once time_limit has passed or, for a reproducible budget, once
+    max_nodes nodes have been seen; as usual, the interrupted iteration's result is dropped.
+
+    If transposition_table is true, one depth-tagged table is kept across all the
+    iterations. Entries from shallower iterations can't stand in for deeper searches,
+    but each state's stored best move is searched first (after randomizing move ordering,
+    if applicable). This helps explore "better" branches earlier, improving pruning.
     This improvement often makes up for the costs of repeatedly searching
     shallower depths.
-    """
-    end_time = time() + time_limit
-    if transposition_table:
-        t_table = {}
-        old_values = {}
-
-    maximizer = initial_state.get_current_player()
-    cutoff = 0
-
-    # A recursive helper function.
-    # Has access to all the parameters of the outer function,
-    # avoids excessive passing of unchanging parameters
-    def MinimaxAlphaBetaSearch_helper(state, _alpha_, _beta_):
-        counter['num_nodes_seen'][0] += 1
-        counter['num_nodes_seen'][-1] += 1
-        if transposition_table and state in t_table:
-            best_leaf_node, best_exp_util = t_table[state]
-            terminated = state_callback_fn(state, best_exp_util) if VIS_POST else False
-            return None, None, best_exp_util, terminated #could return best_leaf_node but might be funky?
-        is_maximizer = state.get_current_player() == maximizer
+    If transposition_table is a TranspositionTable (e.g. kept by an agent between moves),
+    its entries are also left for later searches.
 
-        # Base case - endgame leaf node:
-        if state.is_endgame_state() :
-            counter['num_endgame_evals'][0] += 1
-            counter['num_endgame_evals'][-1] += 1
-            endgame_util = util_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, endgame_util
-            # Visualize leaf node with utility, check for early termination signal
-            terminated = state_callback_fn(state, endgame_util) if VIS_ENDGAME else False
-            if time() >  end_time :
-                terminated = True
+    If in_place is True, each iteration walks one scratch copy of initial_state
+    with make_move / unmake_move instead of generating a node per edge
+    (see MinimaxAlphaBetaSearch).
 
-            return None, state, endgame_util, terminated
+    If aspiration_window is a number, each iteration after the first searches with
+    (alpha, beta) = (last value - aspiration_window, last value + aspiration_window).
+    If the value falls outside, it is only a bound, so that side of the window
+    is opened up and the iteration is re-searched (counted in counter['num_aspiration_researches']).
 
-        # Early cutoff evaluation:
-        if state.get_path_length() - initial_state.get_path_length() >= cutoff:
-            counter['num_heuristic_evals'][0] += 1
-            counter['num_heuristic_evals'][-1] += 1
-            heuristic_eval = eval_fn(state, maximizer)
-            if transposition_table:
-                t_table[state] =  state, heuristic_eval
-            # Visualize leaf node with evaluation, check for early termination signal
-            terminated = state_callback_fn(state, heuristic_eval) if VIS_CUTOFF else False
-            if time() >  end_time :
-                terminated = True
+    If pvs is True, only the first (hopefully best) child of each state is searched
+    with the full window. The rest are searched with a null window, which can only prove
+    them no better; a child that turns out better is re-searched with the full window
+    (counted in counter['num_pvs_researches']).
 
-            return None, state, heuristic_eval, terminated
+    If move_ordering is True (or a MoveOrderer), moves are ordered as in MinimaxAlphaBetaSearch;
+    killer moves and history carry over from one iteration to the next.
+    """
+    # Reads the clock only every so many nodes, rather than at every node
+    deadline = DeadlineChecker(time_limit, max_calls = max_nodes)
+    cutoff = 0
+    if aspiration_window:
+        counter.setdefault('num_aspiration_researches', [0])
+    tree_search = GameTreeSearch(initial_state, util_fn, eval_fn, state_callback_fn, counter,
+        opponent_policy = MIN_NODE,
+        prune = True,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place,
+        move_ordering = move_ordering,
+        pvs = pvs,
+        # MOVE ORDERING BY OLD SEARCH RESULTS: try the best move stored by an earlier iteration first
+        table_move_first = True,
+        deadline = deadline)
 
-        # Recursive step - maximize expected utility amongst actions
-        # This is expanding!
-        # Visualize on downwards traversal.
-        state_callback_fn(state,None) if VIS_PRE else False
+    best_actions , best_leaf_nodes, best_exp_utils, terminated = [], [], [], False
 
-        maximize = (maximizer == state.get_current_player())
 
-        best_action , best_leaf_node, best_exp_util, terminated = None, None, None, False
+    while not terminated:
+        cutoff += 1
+        for count in counter:
+            counter[count].append(0)
+        window_alpha, window_beta = -INF, INF
+        if aspiration_window and best_exp_utils:
+            window_alpha, window_beta = best_exp_utils[-1] - aspiration_window, best_exp_utils[-1] + aspiration_window
 
-        states_and_actions = state.generate_next_states_and_actions()
-        if random_move_order:
-            random.shuffle(states_and_actions)
-        if transposition_table:
-            states_and_actions = sorted(states_and_actions,
-                key = lambda st_ac: old_values[st_ac[0]] if st_ac[0] in old_values else (_alpha_ if maximize else _beta_),
-                reverse = maximize)
-
-        # MOVE ORDERING BY OLD SEARCH VALUES
-        for child_state, action in states_and_actions:
-
-            # Recursively Search from the child_state
-            child_action, leaf_node, exp_util, terminated = MinimaxAlphaBetaSearch_helper(child_state, _alpha_, _beta_)
-
-            if maximize:
-                if best_exp_util == None or exp_util > best_exp_util:
-                    best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util,
-                    _alpha_ = max(best_exp_util, _alpha_)
-            else: #minimizing
-                if best_exp_util == None or exp_util < best_exp_util:
-                    best_action , best_leaf_node, best_exp_util = action, leaf_node, exp_util,
-                    _beta_ = min(best_exp_util, _beta_)
-
-            # Visualize mid-expansion, now with partial updated utility!
-            if VIS_MID:
-                terminated = state_callback_fn(state, best_exp_util)
-            if terminated : # early termination - dont go down more branches
+        while True:
+            best_action , best_leaf_node, best_exp_util, terminated = tree_search.search(cutoff, window_alpha, window_beta)
+            if terminated:
                 break
-            if _alpha_ >= _beta_:
+            # Failed low / high - the value is only a bound, so open up that side of the window and re-search
+            if best_exp_util <= window_alpha and window_alpha > -INF:
+                window_alpha = -INF
+            elif best_exp_util >= window_beta and window_beta < INF:
+                window_beta = INF
+            else:
                 break
+            counter['num_aspiration_researches'][0] += 1
+            counter['num_aspiration_researches'][-1] += 1
 
-        # Visualize on upwards traversal, now with fully updated utility!
-        if transposition_table and not(_alpha_ >= _beta_): # CAREFUL - don't update table if unsure because of cutoff.
-            t_table[state] = best_leaf_node, best_exp_util
-        terminated = (state_callback_fn(state, best_exp_util) if VIS_POST else False)
-        if time() >  end_time :
-            terminated = True
-        return best_action , best_leaf_node, best_exp_util, terminated
-        ### End of recursive helper function ###
+        if not terminated:
+            best_actions.append(best_action)
+            best_leaf_nodes.append(best_leaf_node)
+            best_exp_utils.append(best_exp_util)
+
+        # If no heuristic evals (or depth-limited table hits) on this iteration, reached endgame depth
+        if tree_search.num_depth_limited == 0:
+            cutoff += 1
+            break
 
+    return best_actions, best_leaf_nodes, best_exp_utils, cutoff - 1
 
+### EXTENSION: MTD(f) #################################################
 
-    best_actions , best_leaf_nodes, best_exp_utils, terminated = [], [], [], False
+def MTDfProgressiveDeepening (initial_state,
+    util_fn,
+    eval_fn = always_zero,
+    time_limit = INF,
+    state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_nodes_seen':[0], 'num_endgame_evals':[0], 'num_heuristic_evals':[0]}, # A counter for tracking stats
+    random_move_order = False,     # If true, consider moves in random order
+    transposition_table = True,    # A TranspositionTable to use (and keep filled); otherwise a new one
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    move_ordering = False,    # If true (or a MoveOrderer), order moves by table move, killer moves and history
+    max_nodes = INF,    # Stop after searching this many nodes (an exact budget, unlike time_limit)
+    first_guess = 0,    # The guess at the value for the first iteration
+    ):
+    """
+    Progressive deepening by MTD(f) (Plaat et al.): each iteration finds the minimax value
+    with only null-window alpha-beta searches, starting from an earlier iteration's value as a guess
+    (two iterations back, since odd and even cutoffs' values tend to alternate).
+
+    A null-window search around a guess g can only answer whether the value is at least g
+    (returning a lower bound) or below it (an upper bound), but it prunes far more than a
+    full-window search. Each answer moves the next guess to the bound it returned, until the
+    lower and upper bounds meet at the value. The repeated searches revisit the same states,
+    so MTD(f) always keeps a transposition table (a new one, unless transposition_table is a
+    TranspositionTable), whose stored bounds let most of a re-search be skipped.
+    The better the guess, the fewer searches it takes; counter['num_mtdf_searches'] counts them.
+
+    The iteration's best action is the one found by its last search that failed high,
+    since that search proved the action is worth at least the value. (Its leaf is often
+    None, since null-window searches end on stored bounds much more often.)
+
+    Returns the same 4-tuple as ProgressiveDeepening.
+    """
+    deadline = DeadlineChecker(time_limit, max_calls = max_nodes)
+    cutoff = 0
+    counter.setdefault('num_mtdf_searches', [0])
+    if not isinstance(transposition_table, TranspositionTable):
+        transposition_table = True
+    tree_search = GameTreeSearch(initial_state, util_fn, eval_fn, state_callback_fn, counter,
+        opponent_policy = MIN_NODE,
+        prune = True,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place,
+        move_ordering = move_ordering,
+        table_move_first = True,
+        deadline = deadline)
 
+    best_actions , best_leaf_nodes, best_exp_utils, terminated = [], [], [], False
+    guess = first_guess
 
     while not terminated:
         cutoff += 1
         for count in counter:
             counter[count].append(0)
+        lower_bound, upper_bound = -INF, INF
+        best_action, best_leaf_node = None, None
+        num_depth_limited = 0
+        # Odd and even cutoffs end on different players' moves, so their values tend to alternate
+        if len(best_exp_utils) >= 2:
+            guess = best_exp_utils[-2]
+        while lower_bound < upper_bound:
+            # Is the value at least beta? (Just above a proven lower bound, or else at the guess)
+            beta = math.nextafter(guess, INF) if guess == lower_bound else guess
+            action, leaf_node, guess, terminated = tree_search.search(cutoff, math.nextafter(beta, -INF), beta)
+            if terminated:
+                break
+            counter['num_mtdf_searches'][0] += 1
+            counter['num_mtdf_searches'][-1] += 1
+            num_depth_limited += tree_search.num_depth_limited
+            if guess < beta:
+                upper_bound = guess
+            else:
+                lower_bound = guess
+                best_action, best_leaf_node = action, leaf_node
+        if terminated:
+            break
 
-        # Simply call the helper function on the initial_state.
-        best_action , best_leaf_node, best_exp_util, terminated = MinimaxAlphaBetaSearch_helper(initial_state, _alpha_ = -INF, _beta_ = INF)
+        best_actions.append(best_action)
+        best_leaf_nodes.append(best_leaf_node)
+        best_exp_utils.append(lower_bound)
 
-        if not terminated:
-            best_actions.append(best_action)
-            best_leaf_nodes.append(best_leaf_node)
-            best_exp_utils.append(best_exp_util)
-            if transposition_table :
-                for state in t_table:
-                    old_values[state] = t_table[state][1]
-                t_table = {}
-
-        # If no heuristic evals done on this iteration, reached endgame depth
-        if counter['num_heuristic_evals'][-1] == 0:
+        # If no heuristic evals (or depth-limited table hits) on this iteration, reached endgame depth
+        if num_depth_limited == 0:
             cutoff += 1
             break
 
     return best_actions, best_leaf_nodes, best_exp_utils, cutoff - 1
 
+### EXTENSION: Parallel alpha-beta #################################################
+
+def _parallel_root_worker(args):
+    """
+    Searches one root move's subtree in a worker process of ParallelRootAlphaBetaSearch.
+    Returns its value, the actions from child_state to the leaf of its expected path
+    (or None), and the worker's counter.
+    """
+    (child_state, util_fn, eval_fn, cutoff, maximizer, alpha, beta,
+        random_move_order, transposition_table, in_place, move_ordering) = args
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}
+    _, leaf_node, exp_util, _ = GameTreeSearch(child_state, util_fn, eval_fn, counter = counter,
+        opponent_policy = MIN_NODE,
+        prune = True,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place,
+        move_ordering = move_ordering,
+        maximizer = maximizer).search(cutoff, alpha, beta)
+    leaf_line = None if leaf_node is None else [state.previous_action for state in leaf_node.get_path()[1:]]
+    return exp_util, leaf_line, counter
+
+
+def ParallelRootAlphaBetaSearch(initial_state,
+    util_fn,
+    eval_fn = always_zero,
+    cutoff = INF,
+    state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
+    random_move_order = False,     # If true, consider moves in random order
+    transposition_table = False,    # If true, use a transposition table.
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    move_ordering = False,    # If true (or a MoveOrderer), order moves by table move, killer moves and history
+    num_workers = None,    # How many processes search root moves at once; by default, one per CPU
+    ):
+    """
+    MinimaxAlphaBetaSearch with the root moves split over a process pool.
+
+    The first root move is searched here (with state_callback_fn, and the given
+    transposition table / MoveOrderer), to find a lower bound on the root's value.
+    The remaining root moves are then searched at once in a ProcessPoolExecutor,
+    each with the window (that bound, INF): a move that can't beat the first one
+    fails low, as it would in the serial search. The best move is kept, ties going
+    to the earlier move as in MinimaxAlphaBetaSearch, and the workers' counts are
+    added to counter.
+
+    Workers have no GUI callback, and their own transposition tables and MoveOrderers.
+    util_fn, eval_fn and the game state must be picklable (e.g. defined at module level).
+    Returns the same 4-tuple as MinimaxAlphaBetaSearch.
+    """
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    if cutoff < 1 or initial_state.is_endgame_state(): # no root moves to split
+        return MinimaxAlphaBetaSearch(initial_state, util_fn, eval_fn, cutoff, state_callback_fn, counter,
+            random_move_order, transposition_table, in_place, move_ordering)
+
+    maximizer = initial_state.get_current_player()
+    counter['num_nodes_seen'] += 1 # the root
+    all_actions = initial_state.get_all_actions(custom_move_ordering = bool(move_ordering))
+    if random_move_order:
+        random.shuffle(all_actions)
+
+    best_action = all_actions[0]
+    _, best_leaf_node, best_exp_util, terminated = GameTreeSearch(initial_state.generate_next_state(best_action),
+        util_fn, eval_fn, state_callback_fn, counter,
+        opponent_policy = MIN_NODE,
+        prune = True,
+        random_move_order = random_move_order,
+        transposition_table = transposition_table,
+        in_place = in_place,
+        move_ordering = move_ordering,
+        maximizer = maximizer).search(cutoff - 1)
+    if terminated or len(all_actions) == 1:
+        return best_action, best_leaf_node, best_exp_util, terminated
+
+    # (Detached copies, so that pickling them doesn't copy their whole paths;
+    # workers re-seed from the OS, so they don't all shuffle moves the same way)
+    with ProcessPoolExecutor(max_workers = num_workers, initializer = random.seed) as executor:
+        futures = [executor.submit(_parallel_root_worker,
+                (initial_state.generate_next_state(action).clone_detached(), util_fn, eval_fn, cutoff - 1,
+                maximizer, best_exp_util, INF, random_move_order, bool(transposition_table), in_place, bool(move_ordering)))
+            for action in all_actions[1:]]
+        results = [future.result() for future in futures]
+
+    for action, (exp_util, leaf_line, worker_counter) in zip(all_actions[1:], results):
+        for count in worker_counter:
+            counter[count] = counter.get(count, 0) + worker_counter[count]
+        if exp_util > best_exp_util:
+            best_action, best_exp_util = action, exp_util
+            best_leaf_node = materialize_leaf(initial_state.generate_next_state(action), leaf_line)
+
+    # Visualize the root, now with its value
+    terminated = state_callback_fn(initial_state, best_exp_util) if VIS_POST else False
+    return best_action, best_leaf_node, best_exp_util, terminated
+
+NUM_ABORT_FLAGS = 2 ** 16
+# What a YoungBrothersWaitSearch worker process keeps for all its jobs in a search
+_ybw_worker_state = {}
+
+def _ybw_worker_init(abort_flags_name, transposition_table, move_ordering):
+    random.seed() # re-seed from the OS, so workers don't all shuffle moves the same way
+    _ybw_worker_state['abort_flags'] = shared_memory.SharedMemory(name = abort_flags_name)
+    _ybw_worker_state['t_table'] = TranspositionTable() if transposition_table else False
+    _ybw_worker_state['move_orderer'] = MoveOrderer() if move_ordering else False
+
+def _ybw_worker(args):
+    """
+    Searches one subtree at the bottom of YoungBrothersWaitSearch's split region
+    in a worker process, giving up as soon as its abort flag is raised.
+    Returns its value, the actions from state to the leaf of its expected path
+    (or None), and the worker's counter.
+    """
+    state, util_fn, eval_fn, cutoff, maximizer, alpha, beta, abort_flag, random_move_order, in_place = args
+    abort_buf = _ybw_worker_state['abort_flags'].buf
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}
+    _, leaf_node, exp_util, _ = GameTreeSearch(state, util_fn, eval_fn,
+        state_callback_fn = lambda state, state_value : abort_buf[abort_flag] != 0,
+        counter = counter,
+        opponent_policy = MIN_NODE,
+        prune = True,
+        random_move_order = random_move_order,
+        transposition_table = _ybw_worker_state['t_table'],
+        in_place = in_place,
+        move_ordering = _ybw_worker_state['move_orderer'],
+        maximizer = maximizer).search(cutoff, alpha, beta)
+    del abort_buf
+    leaf_line = None if leaf_node is None else [node.previous_action for node in leaf_node.get_path()[1:]]
+    return exp_util, leaf_line, counter
+
+
+def YoungBrothersWaitSearch(initial_state,
+    util_fn,
+    eval_fn = always_zero,
+    cutoff = INF,
+    state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}, # A counter for tracking stats
+    random_move_order = False,     # If true, consider moves in random order
+    transposition_table = False,    # If true, use a transposition table (one per worker).
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    move_ordering = False,    # If true, order moves by table move, killer moves and history
+    num_workers = None,    # How many processes search at once; by default, one per CPU
+    min_split_depth = 4,    # Only split nodes with at least this many moves left to search below them
+    ):
+    """
+    MinimaxAlphaBetaSearch parallelized by the Young Brothers Wait Concept (YBWC):
+    a node's first child (the eldest brother) is searched first, on its own, and only
+    then are the rest (the younger brothers) searched in parallel, within the window
+    the eldest brother's value gives. With good move ordering the eldest brother is
+    usually the best move or causes a cutoff outright, so little parallel work is wasted.
+
+    Unlike ParallelRootAlphaBetaSearch, any node can be split, not just the root.
+    The top of the tree (every node with at least min_split_depth moves left below it)
+    is walked here by asyncio tasks, one per node, which only coordinate: each node's task
+    awaits its eldest brother's task, then starts its younger brothers' tasks at once.
+    The subtrees below that "split region" are the jobs, searched by a ProcessPoolExecutor.
+    At most num_workers jobs are handed to the pool at a time. The rest wait in one shared
+    queue here, ordered by their place in the tree (leftmost first, as a serial search would
+    reach them), and an idle worker always gets the first of them - rather than stealing
+    from another worker's queue, as the workers share no memory. So with one worker,
+    the jobs run in the serial search's order.
+
+    As each brother's value comes back, the node's window narrows; once it closes
+    (a cutoff), the younger brothers still being searched are stale. Their tasks are
+    cancelled, which cancels everything below them too: jobs still waiting are dropped,
+    and running jobs see their abort flag (in a shared_memory block) raised and stop at
+    their next node. Counts of jobs and aborted jobs are added to counter
+    ('num_ybw_jobs', 'num_ybw_aborted_jobs'), along with all the jobs' node counts.
+
+    Each job is searched with the window its node (and ancestors) had when the job started,
+    and younger brothers don't get each other's values until they finish, so the total
+    node count is usually higher than MinimaxAlphaBetaSearch's ("search overhead").
+    Each worker keeps its own transposition table / MoveOrderer for all its jobs.
+    The value found is the same, and ties go to the earlier move as in MinimaxAlphaBetaSearch,
+    but with move_ordering or transposition_table a different one of several equally good
+    moves may be chosen.
+    state_callback_fn only sees the nodes of the split region (on the way up).
+    util_fn, eval_fn and the game state must be picklable (e.g. defined at module level).
+    Returns the same 4-tuple as MinimaxAlphaBetaSearch.
+    """
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    maximizer = initial_state.get_current_player()
+    counter.setdefault('num_ybw_jobs', 0)
+    counter.setdefault('num_ybw_aborted_jobs', 0)
+    abort_flags = shared_memory.SharedMemory(create = True, size = NUM_ABORT_FLAGS)
+    abort_buf = abort_flags.buf
+    all_jobs = [] # every job handed to the pool, so their counts can be added up at the end
+    terminated = False
+
+    def current_window(window):
+        """
+        A node's (alpha, beta) window, now: the narrowest of its own and its ancestors'.
+        Windows are [alpha, beta, parent's window] lists, narrowed as brothers' values come in.
+        """
+        _alpha_, _beta_ = -INF, INF
+        while window is not None:
+            _alpha_, _beta_ = max(_alpha_, window[0]), min(_beta_, window[1])
+            window = window[2]
+        return _alpha_, _beta_
+
+    async def acquire_job_slot(path):
+        """ Wait until a worker is free for the job at path (the indices of the actions to it) """
+        nonlocal free_job_slots
+        if free_job_slots > 0 and not job_queue:
+            free_job_slots -= 1
+            return
+        turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(job_queue, (path, turn))
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if turn.done() and not turn.cancelled(): # given the slot, but cancelled before taking it
+                release_job_slot()
+            raise
+
+    def release_job_slot():
+        """ Pass a finished job's worker on to the first job waiting (that is still wanted) """
+        nonlocal free_job_slots
+        while job_queue:
+            _, turn = heapq.heappop(job_queue)
+            if not turn.cancelled():
+                turn.set_result(None)
+                return
+        free_job_slots += 1
+
+    async def run_job(state, depth_left, parent_window, path):
+        """ Search state's subtree in the pool, returning (actions to its leaf, value) """
+        await acquire_job_slot(path)
+        try:
+            abort_flag = len(all_jobs) % NUM_ABORT_FLAGS
+            abort_buf[abort_flag] = 0
+            _alpha_, _beta_ = current_window(parent_window)
+            job = asyncio.wrap_future(executor.submit(_ybw_worker,
+                (state.clone_detached(), util_fn, eval_fn, depth_left, maximizer, _alpha_, _beta_, abort_flag,
+                random_move_order, in_place)))
+            all_jobs.append(job)
+            try:
+                # (Shielded, so that cancelling this task doesn't lose the job's counts)
+                exp_util, leaf_line, _ = await asyncio.shield(job)
+            except asyncio.CancelledError:
+                abort_buf[abort_flag] = 1
+                counter['num_ybw_aborted_jobs'] += 1
+                raise
+        finally:
+            release_job_slot()
+        return leaf_line, exp_util
+
+    async def ybw_helper(state, depth_left, parent_window, path):
+        """ Returns (actions from state to the leaf of its expected path, value) """
+        nonlocal terminated
+        if depth_left < min_split_depth or state.is_endgame_state():
+            return await run_job(state, depth_left, parent_window, path)
+
+        counter['num_nodes_seen'] += 1
+        sign = 1 if state.get_current_player() == maximizer else -1
+        all_actions = state.get_all_actions(custom_move_ordering = move_ordering)
+        if random_move_order:
+            random.shuffle(all_actions)
+        window = [-INF, INF, parent_window]
+
+        # The eldest brother, searched first
+        best_index = 0
+        leaf_line, best_exp_util = await ybw_helper(state.generate_next_state(all_actions[0]), depth_left - 1, window, path + (0,))
+        best_leaf_line = None if leaf_line is None else [all_actions[0]] + leaf_line
+        window[0 if sign > 0 else 1] = best_exp_util
+
+        # The younger brothers, all at once
+        _alpha_, _beta_ = current_window(window)
+        if not terminated and _alpha_ < _beta_ and len(all_actions) > 1:
+            tasks = {asyncio.ensure_future(ybw_helper(state.generate_next_state(action), depth_left - 1, window, path + (index,))) : index
+                for index, action in enumerate(all_actions[1:], start = 1)}
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        leaf_line, exp_util = task.result()
+                        index = tasks[task]
+                        # Ties go to the earlier move, as in the serial search
+                        if sign * exp_util > sign * best_exp_util or (exp_util == best_exp_util and index < best_index):
+                            best_index, best_exp_util = index, exp_util
+                            best_leaf_line = None if leaf_line is None else [all_actions[index]] + leaf_line
+                            window[0 if sign > 0 else 1] = best_exp_util
+                    _alpha_, _beta_ = current_window(window)
+                    if _alpha_ >= _beta_ or terminated:
+                        # Cutoff: the other brothers' values can't matter any more
+                        break
+            finally:
+                # (Also if this node's own task was cancelled, by a cutoff above it)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions = True)
+
+        # Visualize on upwards traversal, now with fully updated utility!
+        if VIS_POST and state_callback_fn(state, best_exp_util):
+            terminated = True
+        return best_leaf_line, best_exp_util
+
+    async def search_root():
+        nonlocal executor
+        with ProcessPoolExecutor(max_workers = num_workers, initializer = _ybw_worker_init,
+                initargs = (abort_flags.name, bool(transposition_table), bool(move_ordering))) as executor:
+            result = await ybw_helper(initial_state, cutoff, None, ())
+            # Let aborted jobs finish, for their counts
+            await asyncio.gather(*all_jobs, return_exceptions = True)
+        return result
+
+    executor = None
+    free_job_slots = num_workers
+    job_queue = [] # (path, future to set when it's the job's turn) heap
+    try:
+        best_leaf_line, best_exp_util = asyncio.run(search_root())
+    finally:
+        del abort_buf
+        abort_flags.close()
+        abort_flags.unlink()
+    counter['num_ybw_jobs'] += len(all_jobs)
+    for job in all_jobs:
+        if not job.cancelled():
+            for count, value in job.result()[2].items():
+                counter[count] = counter.get(count, 0) + value
+    best_leaf_node = materialize_leaf(initial_state, best_leaf_line)
+    best_action = best_leaf_line[0] if best_leaf_line else None
+    return best_action, best_leaf_node, best_exp_util, terminated
+
+
+def _lazy_smp_worker(args):
+    """
+    One helper process of LazySMPProgressiveDeepening: progressively deepens from
+    initial_state, starting at first_cutoff, sharing t_table, until the time limit
+    passes, the main search raises its stop flag, or the game tree is exhausted.
+    Returns the worker's total counts, its table stats, elapsed time and the deepest cutoff completed.
+    """
+    (initial_state, util_fn, eval_fn, time_limit, t_table, stop_flag_name, first_cutoff,
+        in_place, pvs, move_ordering) = args
+    start_time = time()
+    stop_flag = shared_memory.SharedMemory(name = stop_flag_name)
+    stop_buf = stop_flag.buf
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}
+    tree_search = GameTreeSearch(initial_state, util_fn, eval_fn,
+        state_callback_fn = lambda state, state_value : stop_buf[0] != 0,
+        counter = counter,
+        opponent_policy = MIN_NODE,
+        prune = True,
+        # Helpers shuffle their moves (the table move still goes first), so they spread out over the tree
+        random_move_order = True,
+        transposition_table = t_table,
+        in_place = in_place,
+        move_ordering = move_ordering,
+        pvs = pvs,
+        table_move_first = True,
+        deadline = DeadlineChecker(time_limit))
+    cutoff, max_cutoff = first_cutoff, 0
+    while True:
+        terminated = tree_search.search(cutoff)[3]
+        if terminated:
+            break
+        max_cutoff = cutoff
+        if tree_search.num_depth_limited == 0:
+            break
+        cutoff += 1
+    del stop_buf
+    stop_flag.close()
+    return counter, dict(t_table.stats), time() - start_time, max_cutoff
+
+
+def LazySMPProgressiveDeepening (initial_state,
+    util_fn,
+    eval_fn = always_zero,
+    time_limit = INF,
+    state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_nodes_seen':[0], 'num_endgame_evals':[0], 'num_heuristic_evals':[0]}, # A counter for tracking stats
+    random_move_order = False,     # If true, consider moves in random order
+    transposition_table = True,    # Always on; a SharedTranspositionTable given here is used (and kept)
+    in_place = False,    # If true, walk a single scratch state with make_move / unmake_move
+    aspiration_window = None,    # If a number, start each iteration in a window of +/- this around the last value
+    pvs = False,    # If true, use principal variation search (null windows for all but the first child)
+    move_ordering = False,    # If true, order moves by table move, killer moves and history
+    max_nodes = INF,    # Stop after the main search has seen this many nodes
+    num_workers = None,    # How many processes search at once (the main one included); by default, one per CPU
+    ):
+    """
+    ProgressiveDeepening on several processes at once, sharing one transposition table
+    ("Lazy SMP"). The processes don't divide up the work at all: the main search here is
+    just ProgressiveDeepening with a SharedTranspositionTable, and num_workers - 1 helper
+    processes progressively deepen from the same root with the same table, each with
+    its moves shuffled, and every other one starting a cutoff deeper. They fill the
+    table with values and best moves that the main search then hits instead of searching.
+
+    The main search's results are returned (the same 4-tuple as ProgressiveDeepening), and
+    counter holds its counts as usual. When it stops, the helpers are told to stop too, and
+    a per-process report is added to counter once the ProgressiveDeepening counts are done:
+        counter['workers']: a dict per process (the main one first) of its 'num_nodes_seen',
+            'elapsed_time', 'nodes_per_sec', 'tt_hit_rate' (hits per table lookup), and 'max_cutoff'
+        counter['combined_nodes_per_sec'], counter['combined_tt_hit_rate']: the same over all processes
+    Helpers are limited by time_limit and the main search, so max_nodes only limits the main search.
+
+    The table is always used (it's how the processes cooperate). If transposition_table is a
+    SharedTranspositionTable, it is used and left for later searches; otherwise a new one is made.
+    move_ordering can only be a flag, since each process needs its own MoveOrderer.
+    util_fn, eval_fn and the game state must be picklable (e.g. defined at module level).
+    """
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    maximizer = initial_state.get_current_player()
+    t_table = transposition_table if isinstance(transposition_table, SharedTranspositionTable) else SharedTranspositionTable()
+    t_table.new_search(maximizer)
+    stats_before = dict(t_table.stats)
+    stop_flag = shared_memory.SharedMemory(create = True, size = 1)
+    stop_flag.buf[0] = 0
+    start_time = time()
+    try:
+        with ProcessPoolExecutor(max_workers = max(1, num_workers - 1), initializer = random.seed) as executor:
+            futures = [executor.submit(_lazy_smp_worker,
+                    (initial_state.clone_detached(), util_fn, eval_fn, time_limit, t_table, stop_flag.name,
+                    1 + worker % 2, in_place, pvs, bool(move_ordering)))
+                for worker in range(1, num_workers)]
+            try:
+                best_actions, best_leaf_nodes, best_exp_utils, max_cutoff = ProgressiveDeepening(initial_state, util_fn, eval_fn,
+                    time_limit, state_callback_fn, counter,
+                    random_move_order = random_move_order,
+                    transposition_table = t_table,
+                    in_place = in_place,
+                    aspiration_window = aspiration_window,
+                    pvs = pvs,
+                    move_ordering = move_ordering,
+                    max_nodes = max_nodes)
+            finally:
+                stop_flag.buf[0] = 1
+            elapsed_time = time() - start_time
+            results = [future.result() for future in futures]
+    finally:
+        stop_flag.close()
+        stop_flag.unlink()
+
+    main_stats = {stat : t_table.stats[stat] - stats_before[stat] for stat in t_table.stats}
+    workers = [({'num_nodes_seen': counter['num_nodes_seen'][0]}, main_stats, elapsed_time, max_cutoff)] + results
+    counter['workers'] = [{'num_nodes_seen': worker_counter['num_nodes_seen'],
+            'elapsed_time': worker_time,
+            'nodes_per_sec': worker_counter['num_nodes_seen'] / max(worker_time, 1e-9),
+            'tt_hit_rate': stats['num_hits'] / max(stats['num_lookups'], 1),
+            'max_cutoff': worker_cutoff}
+        for worker_counter, stats, worker_time, worker_cutoff in workers]
+    counter['combined_nodes_per_sec'] = sum(worker['num_nodes_seen'] for worker in counter['workers']) / max(elapsed_time, 1e-9)
+    counter['combined_tt_hit_rate'] = (sum(stats['num_hits'] for _, stats, _, _ in workers)
+        / max(sum(stats['num_lookups'] for _, stats, _, _ in workers), 1))
+    return best_actions, best_leaf_nodes, best_exp_utils, max_cutoff
+
 ### EXTENSION: Monte Carlo Tree Search #################################################
 
 """
@@ -888,7 +1729,14 @@ def MonteCarloTreeSearch (initial_state,
     exploration_bias = 1000,
     time_limit = INF,
     state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
-    counter = {'num_simulations':0} # A counter for tracking stats
+    counter = {'num_simulations':0}, # A counter for tracking stats
+    rollouts_per_expansion = 1,    # How many rollouts to run from each expanded node
+    root = None,    # An MCTSNode for initial_state to keep growing (e.g. kept from the previous move); by default a new one
+    rave = False,    # If true, select with RAVE: mean values blended with AMAF statistics
+    rave_equivalence = 1000,    # RAVE's beta schedule: how many visits until a node's own statistics weigh about as much as AMAF's
+    solver = False,    # If true, prove wins, losses and ties (MCTS-Solver), and stop sampling proven subtrees
+    max_tree_nodes = INF,    # Stop expanding the tree once it has this many nodes
+    max_simulations = INF,    # Stop after this many rollouts (an exact budget, unlike time_limit)
     ):
     """
     Monte Carlo Tree Search builds a tree asymetrically, starting with just the root
@@ -905,93 +1753,351 @@ def MonteCarloTreeSearch (initial_state,
         expected (average) utility, walking from the expanded child back up
         to the root state node,
 
-    The process terminates when time_limit is reached, or state_callback_fn returns False.
+    The process terminates when time_limit is reached, max_simulations rollouts have been run
+    (rounded up to a multiple of rollouts_per_expansion), or state_callback_fn returns False.
+
+    Rollouts use the game's random_playout(), which plays on a scratch copy of the
+    state instead of creating a node per move (the rollout's endgame state has no path).
+    If rollouts_per_expansion is more than 1, that many rollouts are run from each
+    expanded node and backed up together (each counts as a simulation).
+
+    If rave is true, each rollout also updates the AMAF ("all moves as first") statistics
+    of every node whose action its chooser played anywhere later in the simulation,
+    so each rollout informs many more nodes than those on its path. Selection then blends
+    each child's mean value with its AMAF mean value, with weight
+    beta = sqrt(rave_equivalence / (3 * visits + rave_equivalence)) on the AMAF mean,
+    which fades from 1 towards 0 as the child's own visits grow (see MCTSNode.best_rave_child).
+
+    If solver is true (MCTS-Solver), endgames are proven outcomes, and outcomes are proven
+    up the tree as they become certain: a node is a win for the player to move if any child is,
+    and is otherwise proven once all its children are (see MCTSNode.prove). Selection skips
+    proven children, so simulations go where the outcome is still uncertain, the search
+    stops early once the root is proven, and a proven win is chosen (or a proven loss avoided)
+    over the most visited child.
+
+    The tree stops growing at max_tree_nodes nodes, bounding the search's memory over long
+    time limits: simulations then descend through the children a node already has
+    (even if it has unexpanded actions left), and roll out from the node they reach.
+    counter['num_tree_nodes'] is kept up to date with the size of the tree.
+
+    If root is given, the search continues growing that tree, whose statistics
+    count towards the result along with the new simulations. Callers can then keep
+    the tree, and re-root it at the next position they search (see MCTSNode.find_descendant).
 
     It then returns the following 4-tuple:
     1) The "best" action to take from initial_state, based on the gathered statistics.
     2) State at the end of the expected path in the grown search tree. (GameStateNode)
     3) Expected utility of the action.
-    4) The number of rollouts performed.
+    4) The number of rollouts the statistics are based on (including any from a given root's earlier searches).
     """
 
-    node_values = defaultdict(lambda : [0,0]) #v_i, n_i. Note that v_i is from the parent's perspective.
-    def get_est_util(state):
-        n_vals = node_values[s]
-        return n_vals[0] / n_vals[1]
+    # The tree is made of MCTSNodes (see mcts_tree.py): each stores its state, children and
+    # statistics once, with a parent pointer for backpropagation.
+    if root is None:
+        root = MCTSNode(initial_state)
+    counter['num_tree_nodes'] = root.count_nodes()
+
+    def can_descend(node):
+        if node.is_endgame:
+            return False
+        if node.is_fully_expanded():
+            return True
+        # Once the tree is full, nodes with unexpanded actions are descended through their existing children
+        return counter['num_tree_nodes'] >= max_tree_nodes and bool(node.unproven_children() if solver else node.children)
+
+    ## select promising leaf node (node with unexplored children, or an endgame).
+    def selection(node):
+        terminated = False
+        while can_descend(node):
+            # Visualize on downwards traversal.
+            if VIS_PRE and node.num_visits > 0:
+                terminated = state_callback_fn(node.state, node.mean_value()) or terminated
+            if rave:
+                node = node.best_rave_child(exploration_bias, rave_equivalence, solver)
+            else:
+                node = node.best_uct_child(exploration_bias, solver)
+        return node, terminated
+
+    ## select unvisited child of node for expansion
+    def expansion(node):
+        # An endgame has no children - its own result is simulated again
+        # (unless solver, which never selects a proven node)
+        if node.is_endgame:
+            return node
+        # A full tree isn't expanded - the node's own result is simulated again
+        if counter['num_tree_nodes'] >= max_tree_nodes:
+            return node
+        counter['num_tree_nodes'] += 1
+        return node.expand()
+
+    def rollout(node):
+        # Returns the summed results, from the perspective of the player to move at node
+        player = node.state.get_current_player()
+        sum_util, terminated = 0, False
+        for _ in range(rollouts_per_expansion):
+            moves_played = [] if rave else None
+            endgame_state = node.state.random_playout(moves_played)
+            final_util = util_fn(endgame_state, player)
+            sum_util += final_util
+            if rave:
+                node.backpropagate_amaf(final_util, player, moves_played)
+            if VIS_ENDGAME:
+                terminated = state_callback_fn(endgame_state, final_util) or terminated
+        return sum_util, terminated
+
+    def backpropagate(node, value):
+        # value is from the perspective of the player to move at the rollout's start
+        node.backpropagate(value, node.state.get_current_player(), rollouts_per_expansion)
+        terminated = False
+        if VIS_POST:
+            while node.parent is not None:
+                terminated = state_callback_fn(node.state, node.mean_value()) or terminated
+                node = node.parent
+        return terminated
 
     terminate_early = False
-    def UCB(state):
-        v_i, n_i = node_values[state]
-
-        N = node_values[state.parent][1]
-        return v_i/n_i + exploration_bias * math.sqrt(2 * math.log(N) / n_i)
-        # if n_i <= 0, should not have been called
-
+    # Reads the clock only every so many simulations, rather than at every one
+    max_iterations = INF if max_simulations == INF else math.ceil(max_simulations / rollouts_per_expansion)
+    deadline = DeadlineChecker(time_limit, max_calls = max_iterations)
+    while (not terminate_early) and not (solver and root.proven_winner is not None) and not deadline.time_up():
+        leaf, terminate_early = selection(root)
+        unvisited_node = expansion(leaf)
+        terminate_early = state_callback_fn(unvisited_node.state, None) or terminate_early
+        result, terminated = rollout(unvisited_node)
+        counter['num_simulations'] += rollouts_per_expansion
+        terminated = backpropagate(unvisited_node, result) or terminated
+        terminate_early = terminate_early or terminated
+        if solver:
+            unvisited_node.propagate_proof()
+
+    # get best state/ action - the most visited child
+    best_child = root.most_visited_child(solver)
+    if best_child is None: # no simulations, or the root is an endgame
+        return None, None, None, root.num_visits
+    # get expected path of best states
+    node = best_child
+    while node.children:
+        node = node.most_visited_child(solver)
+
+    return best_child.action, node.state, best_child.mean_value(), root.num_visits
+
+
+def _root_parallel_mcts_worker(args):
+    """
+    Runs one independent MonteCarloTreeSearch in a worker process of RootParallelMonteCarloTreeSearch.
+    Returns the statistics of the root's children as (action, num_visits, total_value) tuples.
+    """
+    initial_state, util_fn, exploration_bias, time_limit, rollouts_per_expansion, rave, rave_equivalence, solver, max_tree_nodes, max_simulations, seed = args
+    # Forked workers start with the same random state, so each needs its own seed
+    random.seed(seed)
+    root = MCTSNode(initial_state)
+    MonteCarloTreeSearch(initial_state = initial_state,
+        util_fn = util_fn,
+        exploration_bias = exploration_bias,
+        time_limit = time_limit,
+        counter = {'num_simulations':0},
+        rollouts_per_expansion = rollouts_per_expansion,
+        rave = rave,
+        rave_equivalence = rave_equivalence,
+        solver = solver,
+        max_tree_nodes = max_tree_nodes,
+        max_simulations = max_simulations,
+        root = root)
+    return [(child.action, child.num_visits, child.total_value) for child in root.children]
+
+
+def RootParallelMonteCarloTreeSearch (initial_state,
+    util_fn,
+    exploration_bias = 1000,
+    time_limit = INF,
+    state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_simulations':0}, # A counter for tracking stats
+    rollouts_per_expansion = 1,    # How many rollouts to run from each expanded node
+    root = None,    # An MCTSNode for initial_state to keep growing in this process
+    num_workers = None,    # How many searches to run in parallel; by default, one per CPU
+    rave = False,    # If true, each search selects with RAVE (see MonteCarloTreeSearch)
+    rave_equivalence = 1000,    # RAVE's beta schedule
+    solver = False,    # If true, each search proves outcomes (MCTS-Solver, see MonteCarloTreeSearch)
+    max_tree_nodes = INF,    # Each search stops expanding its tree once it has this many nodes
+    max_simulations = INF,    # Each search stops after this many rollouts
+    ):
+    """
+    Root parallelization of Monte Carlo Tree Search: num_workers independent
+    MonteCarloTreeSearches of initial_state run at once, each growing its own tree,
+    and the statistics of their roots' children are merged to choose the action.
+
+    One search runs in this process (growing root, if given, and calling state_callback_fn);
+    the other num_workers - 1 run in a multiprocessing pool, until time_limit
+    or max_simulations (each).
+    If the search in this process is stopped early by state_callback_fn, the pool is
+    terminated and only this process's statistics are used. With solver, if the search in
+    this process proves the root's outcome, the pool is terminated and its result returned.
+    util_fn and the game state must be picklable (e.g. util_fn defined at module level).
+
+    Returns the same 4-tuple as MonteCarloTreeSearch, for the merged statistics:
+    the action whose child was visited most over all searches, the end of this process's
+    expected path for it, its mean value over all searches, and the total number of rollouts.
+    """
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    if root is None:
+        root = MCTSNode(initial_state)
+
+    pool = None
+    if num_workers > 1 and (time_limit != INF or max_simulations != INF):
+        # (A detached copy, so that pickling it doesn't copy its whole path)
+        detached_state = initial_state.clone_detached()
+        pool = multiprocessing.Pool(num_workers - 1)
+        async_results = pool.map_async(_root_parallel_mcts_worker,
+            [(detached_state, util_fn, exploration_bias, time_limit, rollouts_per_expansion, rave, rave_equivalence, solver, max_tree_nodes, max_simulations, random.getrandbits(64))
+                for _ in range(num_workers - 1)])
+
+    start_time, num_simulations_before = time(), counter['num_simulations']
+    local_result = MonteCarloTreeSearch(initial_state = initial_state,
+        util_fn = util_fn,
+        exploration_bias = exploration_bias,
+        time_limit = time_limit,
+        state_callback_fn = state_callback_fn,
+        counter = counter,
+        rollouts_per_expansion = rollouts_per_expansion,
+        rave = rave,
+        rave_equivalence = rave_equivalence,
+        solver = solver,
+        max_tree_nodes = max_tree_nodes,
+        max_simulations = max_simulations,
+        root = root)
+
+    # Merge the root children's statistics, by action
+    visits = {initial_state.action_to_str(child.action) : child.num_visits for child in root.children}
+    values = {initial_state.action_to_str(child.action) : child.total_value for child in root.children}
+    actions = {initial_state.action_to_str(child.action) : child.action for child in root.children}
+    if pool is not None:
+        if (time() - start_time < time_limit
+                and counter['num_simulations'] - num_simulations_before < max_simulations): # stopped early
+            pool.terminate()
+        else:
+            for worker_stats in async_results.get():
+                for action, num_visits, total_value in worker_stats:
+                    action_str = initial_state.action_to_str(action)
+                    visits[action_str] = visits.get(action_str, 0) + num_visits
+                    values[action_str] = values.get(action_str, 0) + total_value
+                    actions[action_str] = action
+                    counter['num_simulations'] += num_visits
+            pool.close()
+        pool.join()
+    if solver and root.proven_winner is not None:
+        return local_result
+
+    if not visits: # no simulations, or the root is an endgame
+        return None, None, None, root.num_visits
+    best_action_str = max(visits, key = lambda action_str: visits[action_str])
+    best_action = actions[best_action_str]
+    best_exp_util = values[best_action_str] / visits[best_action_str]
+    # get expected path of best states, as far as this process's tree goes
+    node = next((child for child in root.children if initial_state.action_to_str(child.action) == best_action_str), None)
+    if node is None:
+        leaf_state = initial_state.generate_next_state(best_action)
+    else:
+        while node.children:
+            node = node.most_visited_child()
+        leaf_state = node.state
+    return best_action, leaf_state, best_exp_util, sum(visits.values())
+
+
+def _tree_parallel_rollout_worker(args):
+    """
+    Runs the rollouts of one expanded node in a worker process of TreeParallelMonteCarloTreeSearch.
+    Returns their summed results, from the perspective of the player to move at state.
+    """
+    state, util_fn, rollouts_per_expansion = args
+    player = state.get_current_player()
+    return sum(util_fn(state.random_playout(), player) for _ in range(rollouts_per_expansion))
 
 
-    ## select promising leaf node (node with unexplored children).
-    def selection(state):
-        # Visualize on downwards traversal.
-        terminate_early = state_callback_fn(state,get_est_util(state)) if VIS_PRE else False
-        children = [child for child, action in state.generate_next_states_and_actions()]
-        if any(child not in node_values for child in children) or state.is_endgame_state():
-            return state
-
-        # otherwise recurse for best leaf
-        best = max(children, key = UCB)
-        return selection(best)
-
-    ## select unvisited child of state for expansion
-    def expansion(state):
-        children = [child for child, action in state.generate_next_states_and_actions() if child not in node_values]
-        # Maybe, sort children for preferred order of actions?
-        # If no unexpanded children,
-        if len(children) < 1 and state.is_endgame_state():
-            return state
-        # Visualize on downwards traversal.
-        terminate_early = state_callback_fn(children[0],None) if VIS_PRE else False
-        return children[0]
-
-    def rollout(state):
-        _, endgame_state, final_util, terminate_early = RandChoice(state, util_fn
-        # , state_callback_fn = state_callback_fn
-        # , counter = counter
-        )
-        terminate_early = state_callback_fn(endgame_state, final_util) if VIS_ENDGAME else False
-        return final_util
-
-    def backpropagate(state, value):
-        node_values[initial_state][1] += 1 # update root game count
-        for s in reversed(state.get_path()[1:]):
-            n_vals = node_values[s]
-            #tricky part - value of node is from parent's perspective.
-            # If that matches the perspective of the rollout state
-            # add the value, otherwise subtract it.
-            if s.parent.current_player == state.current_player:
-                n_vals[0] += value
-            else:
-                n_vals[0] -= value
-            n_vals[1] += 1
-            terminate_early = state_callback_fn(s, n_vals[0] / n_vals[1]) if VIS_POST else False
-
-    end_time = time() + time_limit
-    while (not terminate_early) and time() < end_time:
-        # print("Beginning Selection")
-        leaf = selection(initial_state)
-        # print("Selection done: found the following leaf.\n" + str(leaf))
-        unvisited_state = expansion(leaf)
-        terminate_early = state_callback_fn(unvisited_state, None)
-        # print("Expanding the following child state.\n" + str(unvisited_state))
-        result = rollout(unvisited_state)
-        counter['num_simulations'] += 1
-        backpropagate(unvisited_state, result)
-
-    # get best state/ action
-    best_next_state, best_action = max(initial_state.generate_next_states_and_actions(), key = lambda s_a: node_values[s_a[0]][1])
-    best_final_state = best_next_state
-    # #get expected path of best states
-    while best_final_state in node_values and not best_final_state.is_endgame_state():
-        best_final_state, _ = max(best_final_state.generate_next_states_and_actions(), key = lambda s_a: node_values[s_a[0]][1])
-
-    v_i, n_i = node_values[best_next_state]
-    return best_action, best_final_state, v_i / n_i, node_values[initial_state][1]
+def TreeParallelMonteCarloTreeSearch (initial_state,
+    util_fn,
+    exploration_bias = 1000,
+    time_limit = INF,
+    state_callback_fn =  (lambda state, state_value = 0 : False) , # A callback function for the GUI. If it returns True, terminate
+    counter = {'num_simulations':0}, # A counter for tracking stats
+    rollouts_per_expansion = 1,    # How many rollouts to run from each expanded node
+    root = None,    # An MCTSNode for initial_state to keep growing; by default a new one
+    num_workers = None,    # How many rollouts to run at once in worker processes; by default, one per CPU
+    virtual_loss = 1000,    # Value counted against each node on the path of a pending rollout (about the max utility)
+    max_simulations = INF,    # Stop after this many rollouts have been backed up
+    ):
+    """
+    Tree parallelization of Monte Carlo Tree Search: one shared tree, grown by
+    this process (the coordinator), with up to num_workers rollouts in flight
+    in a multiprocessing pool at once.
+
+    The coordinator repeats MonteCarloTreeSearch's select and expand steps until
+    num_workers rollouts are pending, then waits for the oldest to finish and backs up
+    its result. So that the pending rollouts don't all start from the same path,
+    each one adds a virtual loss to the nodes on its path until its result is in:
+    they count as visited, at a value of -virtual_loss, making UCT prefer other paths.
+
+    util_fn and the game state must be picklable (e.g. util_fn defined at module level).
+    Returns the same 4-tuple as MonteCarloTreeSearch.
+    """
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    if root is None:
+        root = MCTSNode(initial_state)
+
+    ## select promising leaf node, through the virtual losses of pending rollouts
+    def selection(node):
+        while node.is_fully_expanded() and not node.is_endgame:
+            node = node.best_uct_child(exploration_bias)
+        return node
+
+    ## select unvisited child of node for expansion
+    def expansion(node):
+        if node.is_endgame:
+            return node
+        return node.expand()
+
+    def backpropagate(node, value):
+        node.remove_virtual_loss(virtual_loss, rollouts_per_expansion)
+        node.backpropagate(value, node.state.get_current_player(), rollouts_per_expansion)
+        terminated = False
+        if VIS_POST:
+            while node.parent is not None:
+                terminated = state_callback_fn(node.state, node.mean_value()) or terminated
+                node = node.parent
+        return terminated
+
+    # (Workers re-seed from the OS, so they don't all play the same rollouts)
+    pool = multiprocessing.Pool(num_workers, initializer = random.seed)
+    pending = deque() # (node, async result) of the rollouts in flight, oldest first
+    terminate_early = False
+    max_iterations = INF if max_simulations == INF else math.ceil(max_simulations / rollouts_per_expansion)
+    deadline = DeadlineChecker(time_limit, max_calls = max_iterations)
+    while (not terminate_early) and not deadline.time_up():
+        while len(pending) < num_workers:
+            unvisited_node = expansion(selection(root))
+            terminate_early = state_callback_fn(unvisited_node.state, None) or terminate_early
+            unvisited_node.add_virtual_loss(virtual_loss, rollouts_per_expansion)
+            # (A detached copy, so that pickling it doesn't copy its whole path)
+            pending.append((unvisited_node, pool.apply_async(_tree_parallel_rollout_worker,
+                ((unvisited_node.state.clone_detached(), util_fn, rollouts_per_expansion),))))
+        node, async_result = pending.popleft()
+        result = async_result.get()
+        counter['num_simulations'] += rollouts_per_expansion
+        terminate_early = backpropagate(node, result) or terminate_early
+    # Rollouts still in flight are abandoned
+    pool.terminate()
+    pool.join()
+    for node, async_result in pending:
+        node.remove_virtual_loss(virtual_loss, rollouts_per_expansion)
+
+    # get best state/ action - the most visited child
+    best_child = root.most_visited_child()
+    if best_child is None: # no simulations, or the root is an endgame
+        return None, None, None, root.num_visits
+    # get expected path of best states
+    node = best_child
+    while node.children:
+        node = node.most_visited_child()
+
+    return best_child.action, node.state, best_child.mean_value(), root.num_visits
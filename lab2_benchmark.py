@@ -0,0 +1,200 @@
+"""
+Benchmark game search algorithms on the console (no GUI, no visualization),
+reporting node counts and nodes/sec.
+
+Usage:
+    python lab2_benchmark.py [GAME] [INITIAL_STATE_FILE] [ALGORITHM] [CUTOFF_OR_TIME_LIMIT] [HEURISTIC] [OPTIONS]
+    GAME can be tictactoe, nim, connectfour, connectfour_bitboard, or roomba
+    INITIAL_STATE_FILE is a path to a text file or 'default'
+    ALGORITHM can be maxdfs, minimax, expectimax, alphabeta, alphabeta_iterative, alphabeta_parallel, alphabeta_ybw, progressive, progressive_lazy_smp, mtdf, montecarlo, montecarlo_root_parallel, or montecarlo_tree_parallel
+    CUTOFF_OR_TIME_LIMIT is the cutoff depth (classic algorithms) or time limit in seconds (anytime algorithms)
+    HEURISTIC (optional) is the name of a heuristic eval function for the game (default 'zero', ignored by montecarlo algorithms)
+    OPTIONS (optional) are search options, given as --name or --name=value:
+        --transposition_table, --random_move_order, --in_place    (all algorithms)
+        --move_ordering    (alphabeta algorithms, progressive algorithms)
+        --star_pruning, --star2    (expectimax)
+        --max_nodes=N    (progressive algorithms)
+        --pvs, --aspiration_window=WIDTH    (progressive, progressive_lazy_smp)
+        --first_guess=VALUE    (mtdf)
+        --exploration_bias=BIAS, --rollouts_per_expansion=K    (montecarlo algorithms)
+        --rave, --rave_equivalence=VISITS, --solver, --max_tree_nodes=N    (montecarlo, montecarlo_root_parallel)
+        --max_simulations=N    (montecarlo algorithms)
+        --min_split_depth=DEPTH    (alphabeta_ybw)
+        --num_workers=N    (alphabeta_parallel, alphabeta_ybw, progressive_lazy_smp, montecarlo_root_parallel, montecarlo_tree_parallel)
+        --virtual_loss=VALUE    (montecarlo_tree_parallel)
+
+Example: compare the list and bitboard ConnectFour backends
+    python lab2_benchmark.py connectfour initial_states/connectfour_states/connectfour_partial.txt alphabeta 6
+    python lab2_benchmark.py connectfour_bitboard initial_states/connectfour_states/connectfour_partial.txt alphabeta 6
+
+Example: measure principal variation search with a transposition table
+    python lab2_benchmark.py connectfour_bitboard initial_states/connectfour_states/connectfour_partial.txt progressive 5 "simple heuristic" --transposition_table --pvs
+
+Example: compare serial alpha-beta with Young Brothers Wait on 4 processes
+    python lab2_benchmark.py connectfour_bitboard initial_states/connectfour_states/connectfour_uhoh.txt alphabeta 7 "simple heuristic"
+    python lab2_benchmark.py connectfour_bitboard initial_states/connectfour_states/connectfour_uhoh.txt alphabeta_ybw 7 "simple heuristic" --num_workers=4
+
+Example: compare progressive deepening on one process and on 4 sharing a transposition table
+    python lab2_benchmark.py connectfour_bitboard default progressive 5 "simple heuristic" --transposition_table
+    python lab2_benchmark.py connectfour_bitboard default progressive_lazy_smp 5 "simple heuristic" --num_workers=4
+
+Example: compare progressive deepening's node counts with MTD(f)'s (null-window searches only)
+    python lab2_benchmark.py connectfour_bitboard default progressive 5 "advanced heuristic" --transposition_table --pvs
+    python lab2_benchmark.py connectfour_bitboard default mtdf 5 "advanced heuristic"
+
+Example: compare expectimax with and without Star1/Star2 pruning (counts the pruned chance node children)
+    python lab2_benchmark.py nim default expectimax 6 "empty rows"
+    python lab2_benchmark.py nim default expectimax 6 "empty rows" --star_pruning --star2
+
+Example: measure Monte Carlo Tree Search simulations/sec
+    python lab2_benchmark.py roomba default montecarlo 5
+    python lab2_benchmark.py roomba default montecarlo_root_parallel 5 --num_workers=4
+    python lab2_benchmark.py roomba default montecarlo_tree_parallel 5 --num_workers=4
+"""
+from sys import argv
+from time import time
+from math import sqrt
+from lab2_algorithms import *
+from lab2_util_eval import all_fn_dicts
+from connectfour_gamestate import ConnectFourGameState, ConnectFourBitboardGameState
+from tictactoe_gamestate import TicTacToeGameState
+from nim_gamestate import NimGameState
+from roomba_gamestate import RoombaRaceGameState
+
+GAME_CLASSES = {"connectfour":ConnectFourGameState, "connectfour_bitboard": ConnectFourBitboardGameState,
+                "tictactoe": TicTacToeGameState, "nim": NimGameState, "roomba": RoombaRaceGameState}
+
+CLASSIC_ALGORITHMS = {"maxdfs": MaximizingDFS, "minimax": MinimaxSearch,
+                    "expectimax": ExpectimaxSearch, "alphabeta": MinimaxAlphaBetaSearch,
+                    "alphabeta_iterative": MinimaxAlphaBetaSearchIterative, "alphabeta_parallel": ParallelRootAlphaBetaSearch,
+                    "alphabeta_ybw": YoungBrothersWaitSearch}
+PROGRESSIVE_ALGORITHMS = {"progressive": ProgressiveDeepening, "progressive_lazy_smp": LazySMPProgressiveDeepening,
+                        "mtdf": MTDfProgressiveDeepening}
+ASYMMETRIC_ALGORITHMS = {"montecarlo": MonteCarloTreeSearch, "montecarlo_root_parallel": RootParallelMonteCarloTreeSearch,
+                        "montecarlo_tree_parallel": TreeParallelMonteCarloTreeSearch}
+ALL_ALGORITHMS = {**CLASSIC_ALGORITHMS, **PROGRESSIVE_ALGORITHMS, **ASYMMETRIC_ALGORITHMS}
+# Counter entries added by LazySMPProgressiveDeepening, printed separately
+LAZY_SMP_REPORT = ('workers', 'combined_nodes_per_sec', 'combined_tt_hit_rate')
+
+
+def benchmark_classic(search_alg, initial_state, util_fn, eval_fn, cutoff, **options):
+    """
+    Run a classic (depth-limited) search algorithm without visualization.
+    Returns a dict of the search results, counters, elapsed time and nodes/sec.
+    """
+    counter = {'num_nodes_seen':0,'num_endgame_evals':0, 'num_heuristic_evals':0}
+    start_time = time()
+    best_action, best_leaf_node, best_exp_util, terminated = search_alg(
+        initial_state = initial_state,
+        util_fn = util_fn,
+        eval_fn = eval_fn,
+        cutoff = cutoff,
+        counter = counter,
+        **options)
+    elapsed_time = time() - start_time
+    return {'best_action': best_action, 'best_exp_util': best_exp_util, 'counter': counter,
+            'elapsed_time': elapsed_time, 'nodes_per_sec': counter['num_nodes_seen'] / max(elapsed_time, 1e-9)}
+
+
+def benchmark_progressive(search_alg, initial_state, util_fn, eval_fn, time_limit, **options):
+    """
+    Run a progressive deepening style (anytime) search algorithm without visualization.
+    Returns a dict of the search results, counters, elapsed time and nodes/sec.
+    """
+    counter = {'num_nodes_seen':[0], 'num_endgame_evals':[0], 'num_heuristic_evals':[0]}
+    start_time = time()
+    best_actions, best_leaf_nodes, best_exp_utils, max_cutoff = search_alg(
+        initial_state = initial_state,
+        util_fn = util_fn,
+        eval_fn = eval_fn,
+        time_limit = time_limit,
+        counter = counter,
+        **options)
+    elapsed_time = time() - start_time
+    return {'best_action': best_actions[-1] if best_actions else None,
+            'best_exp_util': best_exp_utils[-1] if best_exp_utils else None,
+            'max_cutoff': max_cutoff, 'counter': counter,
+            'elapsed_time': elapsed_time, 'nodes_per_sec': counter['num_nodes_seen'][0] / max(elapsed_time, 1e-9)}
+
+
+def benchmark_montecarlo(search_alg, initial_state, util_fn, time_limit, exploration_bias = 1000 * sqrt(2), **options):
+    """
+    Run a Monte Carlo Tree Search style algorithm without visualization.
+    Returns a dict of the search results, counters, elapsed time and simulations/sec.
+    """
+    counter = {'num_simulations':0}
+    start_time = time()
+    best_action, best_leaf_node, best_exp_util, num_simulations = search_alg(
+        initial_state = initial_state,
+        util_fn = util_fn,
+        exploration_bias = exploration_bias,
+        time_limit = time_limit,
+        counter = counter,
+        **options)
+    elapsed_time = time() - start_time
+    return {'best_action': best_action, 'best_exp_util': best_exp_util, 'counter': counter,
+            'elapsed_time': elapsed_time, 'simulations_per_sec': counter['num_simulations'] / max(elapsed_time, 1e-9)}
+
+
+def parse_options(args):
+    """
+    Parse --name or --name=value command line options into search algorithm keyword arguments.
+    Values are converted to numbers (ints if whole) where possible; bare flags are True.
+    """
+    options = {}
+    for arg in args:
+        name, _, value = arg[2:].partition('=')
+        if value == '':
+            options[name] = True
+        else:
+            try:
+                options[name] = int(value)
+            except ValueError:
+                try:
+                    options[name] = float(value)
+                except ValueError:
+                    options[name] = value
+    return options
+
+
+def print_results(name, results):
+    print("{}: best action {} at exp value {}".format(name, results['best_action'], results['best_exp_util']))
+    if 'max_cutoff' in results:
+        print("  Max cutoff completed: {}".format(results['max_cutoff']))
+    counter = results['counter']
+    print("  Counter: {}".format({count: counter[count] for count in counter if count not in LAZY_SMP_REPORT}))
+    if 'workers' in counter:
+        for n, worker in enumerate(counter['workers']):
+            print("  Process {}: {} nodes | Nodes/sec: {:.0f} | TT hit rate: {:.1%} | Max cutoff: {}".format(
+                n, worker['num_nodes_seen'], worker['nodes_per_sec'], worker['tt_hit_rate'], worker['max_cutoff']))
+        print("  Combined Nodes/sec: {:.0f} | TT hit rate: {:.1%}".format(counter['combined_nodes_per_sec'], counter['combined_tt_hit_rate']))
+    if 'simulations_per_sec' in results:
+        print("  Elapsed time: {:.4f} s | Simulations/sec: {:.0f}".format(results['elapsed_time'], results['simulations_per_sec']))
+    else:
+        print("  Elapsed time: {:.4f} s | Nodes/sec: {:.0f}".format(results['elapsed_time'], results['nodes_per_sec']))
+
+
+if __name__ == "__main__":
+    options = parse_options(arg for arg in argv[1:] if arg.startswith('--'))
+    argv = [arg for arg in argv if not arg.startswith('--')]
+    if len(argv) < 5 or argv[1] not in GAME_CLASSES or argv[3] not in ALL_ALGORITHMS:
+        print("Usage:    python lab2_benchmark.py [GAME] [INITIAL_STATE_FILE] [ALGORITHM] [CUTOFF_OR_TIME_LIMIT] [HEURISTIC]")
+        print("          GAME can be " + " or ".join("'{}'".format(game) for game in GAME_CLASSES))
+        print("          INITIAL_STATE_FILE is a path to a text file, OR \"default\"")
+        print("          ALGORITHM should be one of the following: {}".format(str(list(ALL_ALGORITHMS))))
+        quit()
+
+    game_class = GAME_CLASSES[argv[1]]
+    initial_state = game_class.defaultInitialState() if argv[2] == 'default' else game_class.readFromFile(argv[2])
+    fn_dicts = all_fn_dicts[game_class]
+    util_fn = fn_dicts['endgame_util_fn_dict']['faster']
+    eval_fn = fn_dicts['heuristic_eval_fn_dict'][argv[5] if len(argv) > 5 else 'zero']
+    limit = float(argv[4])
+
+    if argv[3] in CLASSIC_ALGORITHMS:
+        results = benchmark_classic(CLASSIC_ALGORITHMS[argv[3]], initial_state, util_fn, eval_fn, cutoff = limit, **options)
+    elif argv[3] in PROGRESSIVE_ALGORITHMS:
+        results = benchmark_progressive(PROGRESSIVE_ALGORITHMS[argv[3]], initial_state, util_fn, eval_fn, time_limit = limit, **options)
+    else:
+        results = benchmark_montecarlo(ASYMMETRIC_ALGORITHMS[argv[3]], initial_state, util_fn, time_limit = limit, **options)
+    print_results("{} on {}".format(argv[3], argv[1]), results)
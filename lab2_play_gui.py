@@ -3,9 +3,9 @@ Play games between 2 agents on the GUI
 
 Usage:
     python lab2_play_gui.py [GAME] [INITIAL_STATE_FILE] [AGENT_1] [AGENT_2] ...")
-    GAME can be tictactoe, nim, connectfour, or roomba
+    GAME can be tictactoe, nim, connectfour, connectfour_bitboard, or roomba
     INITIAL_STATE_FILE is a path to a text file or 'default'
-    AGENT_# can be human, random, maxdfs, minimax, expectimax, alphabeta, progressive, or montecarlo
+    AGENT_# can be human, random, maxdfs, minimax, expectimax, alphabeta, alphabeta_iterative, progressive, or montecarlo
 """
 
 from traceback import format_exc
@@ -14,7 +14,7 @@ from time import time, sleep
 from tkinter import * # Tk, Canvas, Frame, Listbox, Button, Checkbutton, IntVar, StringVar, Spinbox, Label
 from lab2_algorithms import *
 from gamestatenode import GameStateNode
-from connectfour_gamestate import ConnectFourGameState
+from connectfour_gamestate import ConnectFourGameState, ConnectFourBitboardGameState
 from tictactoe_gamestate import TicTacToeGameState
 from nim_gamestate import NimGameState
 from roomba_gamestate import RoombaRaceGameState, FLOOR, WALL, CLEANED
@@ -43,13 +43,18 @@ COLORS = {FLOOR : 'pale green', WALL : 'gray25', CLEANED[1] : 'tomato', CLEANED[
 
 
 PROVIDED_ALGORITHMS = {"0) Random Policy" : RandChoice}
-CLASSIC_ALGORITHMS = {"0) Random Policy" : RandChoice, "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch, "4) Alpha-beta" : MinimaxAlphaBetaSearch}
-PROGRESSIVE_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening}
-ANYTIME_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening,  "6) MonteCarloTreeSearch": MonteCarloTreeSearch}
+CLASSIC_ALGORITHMS = {"0) Random Policy" : RandChoice, "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch, "3s) Expectimax (Star2)" : Star2ExpectimaxSearch, "4) Alpha-beta" : MinimaxAlphaBetaSearch,
+                        "4i) Alpha-beta (iterative)" : MinimaxAlphaBetaSearchIterative, "4p) Alpha-beta (parallel root)" : ParallelRootAlphaBetaSearch,
+                        "4y) Alpha-beta (YBWC)" : YoungBrothersWaitSearch}
+PROGRESSIVE_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening, "5s) Prog. Deepening (Lazy SMP)" : LazySMPProgressiveDeepening, "5m) MTD(f)" : MTDfProgressiveDeepening}
+ANYTIME_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening, "5s) Prog. Deepening (Lazy SMP)" : LazySMPProgressiveDeepening, "5m) MTD(f)" : MTDfProgressiveDeepening,
+                        "6) MonteCarloTreeSearch": MonteCarloTreeSearch}
 ASYMMETRIC_ALGORITHMS = {"6) MonteCarloTreeSearch": MonteCarloTreeSearch}
 ALGORITHMS =  {"0) Random Policy" : RandChoice,
-                "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch,
-                "4) Alpha-beta" : MinimaxAlphaBetaSearch, "5) Prog. Deepening" : ProgressiveDeepening,
+                "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch, "3s) Expectimax (Star2)" : Star2ExpectimaxSearch,
+                "4) Alpha-beta" : MinimaxAlphaBetaSearch, "4i) Alpha-beta (iterative)" : MinimaxAlphaBetaSearchIterative,
+                "4p) Alpha-beta (parallel root)" : ParallelRootAlphaBetaSearch, "4y) Alpha-beta (YBWC)" : YoungBrothersWaitSearch,
+                "5) Prog. Deepening" : ProgressiveDeepening, "5s) Prog. Deepening (Lazy SMP)" : LazySMPProgressiveDeepening, "5m) MTD(f)" : MTDfProgressiveDeepening,
                 "6) MonteCarloTreeSearch": MonteCarloTreeSearch}
 
 
@@ -322,6 +327,8 @@ class Lab2GUI_PLAY:
     def restart_game(self, event = None) :
         if self.status in (INITIAL_WAITING,FINISHED_COMPLETE, FINISHED_NO_ACTION):
             self.current_state = self.initial_state
+            for agent in self.playing_agents.values():
+                agent.new_game()
             self.visualize_state(self.current_state.clone_as_root())
             self.update_status_and_ui(INITIAL_WAITING)
             self.continue_game()
@@ -782,12 +789,14 @@ class ConnectFourGUI(Lab2GUI_PLAY):
 GAME_CLASSES_AND_GUIS = {'roomba': (RoombaRaceGameState, RoombaRaceGUI),
                         'tictactoe': (TicTacToeGameState,TicTacToeGUI),
                         'connectfour': (ConnectFourGameState, ConnectFourGUI),
+                        'connectfour_bitboard': (ConnectFourBitboardGameState, ConnectFourGUI),
                         'nim': (NimGameState, NimGUI)}
 
 
 PLAYING_AGENTS = {"human":HumanTextInputAgent, "random":RandChoiceAgent,
                     "maxdfs": MaximizingDFSAgent, "minimax":MinimaxSearchAgent,
                     "expectimax": ExpectimaxSearchAgent, "alphabeta": MinimaxAlphaBetaSearchAgent,
+                    "alphabeta_iterative": MinimaxAlphaBetaSearchIterativeAgent,
                     "progressive":ProgressiveDeepeningSearchAgent, "montecarlo":MonteCarloTreeSearchAgent}
 
 if len(argv) < 2 :
@@ -3,23 +3,24 @@ Play games between 2 agents on the console with text
 
 Usage:
     python lab2_play_text.py [GAME] [INITIAL_STATE_FILE] [AGENT_1] [AGENT_2] ...")
-    GAME can be tictactoe, nim, connectfour, or roomba
+    GAME can be tictactoe, nim, connectfour, connectfour_bitboard, or roomba
     INITIAL_STATE_FILE is a path to a text file or 'default'
-    AGENT_# can be human, random, maxdfs, minimax, expectimax, alphabeta, progressive, or montecarlo
+    AGENT_# can be human, random, maxdfs, minimax, expectimax, alphabeta, alphabeta_iterative, progressive, or montecarlo
 """
 from sys import argv
 from time import sleep, time
-from connectfour_gamestate import ConnectFourGameState
+from connectfour_gamestate import ConnectFourGameState, ConnectFourBitboardGameState
 from tictactoe_gamestate import TicTacToeGameState
 from nim_gamestate import NimGameState
 from roomba_gamestate import RoombaRaceGameState
 from game_playing_agents import *
 
-GAME_CLASSES = {"connectfour":ConnectFourGameState, "tictactoe": TicTacToeGameState, "nim": NimGameState, "roomba": RoombaRaceGameState}
+GAME_CLASSES = {"connectfour":ConnectFourGameState, "connectfour_bitboard": ConnectFourBitboardGameState, "tictactoe": TicTacToeGameState, "nim": NimGameState, "roomba": RoombaRaceGameState}
 
 PLAYING_AGENTS = {"human":HumanTextInputAgent, "random":RandChoiceAgent,
                     "maxdfs": MaximizingDFSAgent, "minimax":MinimaxSearchAgent,
                     "expectimax": ExpectimaxSearchAgent, "alphabeta": MinimaxAlphaBetaSearchAgent,
+                    "alphabeta_iterative": MinimaxAlphaBetaSearchIterativeAgent,
                     "progressive":ProgressiveDeepeningSearchAgent, "montecarlo":MonteCarloTreeSearchAgent}
 
 if len(argv) < 2 :
@@ -4,7 +4,7 @@ Use it to test your algorithms, evaluation functions, and game representations.
 
 Usage:
     python lab2_test_gui.py [GAME] [INITIAL_STATE_FILE]
-    GAME can be tictactoe, nim, connectfour, or roomba
+    GAME can be tictactoe, nim, connectfour, connectfour_bitboard, or roomba
     INITIAL_STATE_FILE is a path to a text file or 'default'
 """
 from traceback import format_exc
@@ -14,7 +14,7 @@ from math import sqrt
 from tkinter import * # Tk, Canvas, Frame, Listbox, Button, Checkbutton, IntVar, StringVar, Spinbox, Label
 from lab2_algorithms import *
 from gamestatenode import GameStateNode
-from connectfour_gamestate import ConnectFourGameState
+from connectfour_gamestate import ConnectFourGameState, ConnectFourBitboardGameState
 from tictactoe_gamestate import TicTacToeGameState
 from nim_gamestate import NimGameState
 from roomba_gamestate import RoombaRaceGameState, FLOOR, WALL, CLEANED
@@ -40,13 +40,18 @@ COLORS = {FLOOR : 'pale green', WALL : 'gray25', CLEANED[1] : 'tomato', CLEANED[
 
 
 PROVIDED_ALGORITHMS = {"0) Random Policy" : RandChoice}
-CLASSIC_ALGORITHMS = {"0) Random Policy" : RandChoice, "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch, "4) Alpha-beta" : MinimaxAlphaBetaSearch}
-PROGRESSIVE_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening}
-ANYTIME_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening,  "6) MonteCarloTreeSearch": MonteCarloTreeSearch}
+CLASSIC_ALGORITHMS = {"0) Random Policy" : RandChoice, "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch, "3s) Expectimax (Star2)" : Star2ExpectimaxSearch, "4) Alpha-beta" : MinimaxAlphaBetaSearch,
+                        "4i) Alpha-beta (iterative)" : MinimaxAlphaBetaSearchIterative, "4p) Alpha-beta (parallel root)" : ParallelRootAlphaBetaSearch,
+                        "4y) Alpha-beta (YBWC)" : YoungBrothersWaitSearch}
+PROGRESSIVE_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening, "5s) Prog. Deepening (Lazy SMP)" : LazySMPProgressiveDeepening, "5m) MTD(f)" : MTDfProgressiveDeepening}
+ANYTIME_ALGORITHMS = {"5) Prog. Deepening" : ProgressiveDeepening, "5s) Prog. Deepening (Lazy SMP)" : LazySMPProgressiveDeepening, "5m) MTD(f)" : MTDfProgressiveDeepening,
+                        "6) MonteCarloTreeSearch": MonteCarloTreeSearch}
 ASYMMETRIC_ALGORITHMS = {"6) MonteCarloTreeSearch": MonteCarloTreeSearch}
 ALGORITHMS =  {"0) Random Policy" : RandChoice,
-                "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch,
-                "4) Alpha-beta" : MinimaxAlphaBetaSearch, "5) Prog. Deepening" : ProgressiveDeepening,
+                "1) Max-DFS" : MaximizingDFS, "2) Minimax" : MinimaxSearch, "3) Expectimax" : ExpectimaxSearch, "3s) Expectimax (Star2)" : Star2ExpectimaxSearch,
+                "4) Alpha-beta" : MinimaxAlphaBetaSearch, "4i) Alpha-beta (iterative)" : MinimaxAlphaBetaSearchIterative,
+                "4p) Alpha-beta (parallel root)" : ParallelRootAlphaBetaSearch, "4y) Alpha-beta (YBWC)" : YoungBrothersWaitSearch,
+                "5) Prog. Deepening" : ProgressiveDeepening, "5s) Prog. Deepening (Lazy SMP)" : LazySMPProgressiveDeepening, "5m) MTD(f)" : MTDfProgressiveDeepening,
                 "6) MonteCarloTreeSearch": MonteCarloTreeSearch}
 
 
@@ -265,6 +270,17 @@ class Lab2GUI_SEARCH:
         self.exploration_bias_label_2 = Label(exploration_bias_frame, text="* sqrt(2)")
         self.exploration_bias_label_2.grid(row = 0, column = 2, sticky = NW)
 
+        # Node budget (progressive deepening) or simulation budget (MCTS) - exact, so runs are reproducible
+        budget_frame = Frame(search_options_frame)
+        budget_frame.grid(row = 4, sticky = NW, pady = 3)
+
+        self.budget_label = Label(budget_frame, text="Max Nodes:" )
+        self.budget_label.grid(row = 0, column = 0, sticky = NW)
+        self.budget_state = StringVar()
+        self.budget_state.set("INF")
+        self.budget_entry = Entry(budget_frame, textvariable = self.budget_state, width = 8)
+        self.budget_entry.grid(row = 0, column = 1, sticky = NW)
+
         #########################################################################################
 
         run_options_frame = Frame(master)
@@ -361,6 +377,8 @@ class Lab2GUI_SEARCH:
             self.exploration_bias_label['state'] = NORMAL
             self.exploration_bias_label_2['state'] = NORMAL
             self.exploration_bias_entry['state'] = NORMAL
+            self.budget_label['state'] = NORMAL
+            self.budget_entry['state'] = NORMAL
             self.on_alg_changed() # set certain UI features based on alg
 
             self.run_pause_button['state'] = NORMAL
@@ -401,6 +419,8 @@ class Lab2GUI_SEARCH:
             self.exploration_bias_label['state'] = DISABLED
             self.exploration_bias_label_2['state'] = DISABLED
             self.exploration_bias_entry['state'] = DISABLED
+            self.budget_label['state'] = DISABLED
+            self.budget_entry['state'] = DISABLED
 
             self.step_button['state'] = NORMAL
             self.run_pause_button['state'] = NORMAL
@@ -549,6 +569,14 @@ class Lab2GUI_SEARCH:
             self.exploration_bias_label_2['state'] = DISABLED
             self.exploration_bias_entry['state'] = DISABLED
 
+        if alg in ANYTIME_ALGORITHMS:
+            self.budget_label['text'] = "Max Sims:" if alg in ASYMMETRIC_ALGORITHMS else "Max Nodes:"
+            self.budget_label['state'] = NORMAL
+            self.budget_entry['state'] = NORMAL
+        else:
+            self.budget_label['state'] = DISABLED
+            self.budget_entry['state'] = DISABLED
+
     def get_alg_selection(self) :
         return self.algorithm_listbox.get(self.algorithm_listbox.curselection()[0])
 
@@ -558,6 +586,11 @@ class Lab2GUI_SEARCH:
     def get_endgame_util_fn_selection(self) :
         return self.endgame_util_fn_listbox.get(self.endgame_util_fn_listbox.curselection()[0])
 
+    def get_budget(self) :
+        """ The node / simulation budget for anytime algorithms (INF for none) """
+        budget = float(self.budget_state.get())
+        return budget if budget == INF else int(budget)
+
 
     def verify_parameters(self, fly_blind):
         if self.current_algorithm_name in PROVIDED_ALGORITHMS or self.current_algorithm_name in CLASSIC_ALGORITHMS:
@@ -568,9 +601,15 @@ class Lab2GUI_SEARCH:
                 self.status_text.set("Cutoff not a valid number. ('INF' for no limit)")
                 return False
         if self.current_algorithm_name in ANYTIME_ALGORITHMS:
+            try:
+                budget = self.get_budget()
+            except Exception:
+                self.update_status_and_ui(INITIAL_WAITING)
+                self.status_text.set("Max Nodes / Sims not a valid number. ('INF' for no limit)")
+                return False
             try:
                 time_limit = float(self.cutoff_time_limit_spinbox.get())
-                if fly_blind and (time_limit == INF) :
+                if fly_blind and (time_limit == INF) and (budget == INF) :
                     self.update_status_and_ui(INITIAL_WAITING)
                     self.status_text.set("Woah there - don't \"fly blind\" with no time limit!")
                     return False
@@ -612,9 +651,12 @@ class Lab2GUI_SEARCH:
             print("{} finished in {:.4f} seconds.".format(self.current_algorithm_name,elapsed_time))
             print('Nodes seen: {} | Endgame evals: {} | Cutoff evals: {}'.format(
                     self.counter_dict['num_nodes_seen'], self.counter_dict['num_endgame_evals'], self.counter_dict['num_heuristic_evals']))
+            if 'num_pruned_chance_children' in self.counter_dict:
+                print('Star1 cutoffs: {} | Star2 cutoffs: {} | Chance node children pruned: {}'.format(
+                    self.counter_dict['num_star1_cutoffs'], self.counter_dict.get('num_star2_cutoffs', 0), self.counter_dict['num_pruned_chance_children']))
             if None in (self.search_result_best_action, self.search_result_best_exp_util):
                 self.update_status_and_ui(FINISHED_NO_RESULT)
-            elif self.search_result_best_leaf_state == None and not bool(self.transposition_table_state.get()) and search_alg != ExpectimaxSearch:
+            elif self.search_result_best_leaf_state == None and not bool(self.transposition_table_state.get()) and search_alg not in (ExpectimaxSearch, Star2ExpectimaxSearch):
                 self.update_status_and_ui(FINISHED_NO_RESULT)
             elif (terminated is True):
                 self.update_status_and_ui(FINISHED_INCOMPLETE)
@@ -631,7 +673,8 @@ class Lab2GUI_SEARCH:
                                     state_callback_fn =  self.alg_callback_blind  if fly_blind  else self.alg_callback , # A callback function for the GUI. If it returns True, terminate
                                     counter = self.counter_dict, # A counter for tracking stats
                                     random_move_order = bool(self.random_move_order_state.get()),
-                                    transposition_table = bool(self.transposition_table_state.get())
+                                    transposition_table = bool(self.transposition_table_state.get()),
+                                    max_nodes = self.get_budget()
                                     )
             elapsed_time = time() - search_start_time
             print("Progressive Deepening search results: ")
@@ -662,11 +705,13 @@ class Lab2GUI_SEARCH:
                                     exploration_bias = float(self.exploration_bias_state.get()) * sqrt(2),
                                     time_limit = float(self.cutoff_time_limit_spinbox.get()),
                                     state_callback_fn =  self.alg_callback_blind  if fly_blind  else self.alg_callback , # A callback function for the GUI. If it returns True, terminate
-                                    counter = self.counter_dict # A counter for tracking stats
+                                    counter = self.counter_dict, # A counter for tracking stats
+                                    max_simulations = self.get_budget()
                                     )
             elapsed_time = time() - search_start_time
             print("{} finished in {:.4f} seconds.".format(self.current_algorithm_name,elapsed_time))
-            print('Simulated Games: {}'.format(self.counter_dict['num_simulations']))
+            print('Simulated Games: {} | Simulations/sec: {:.0f}'.format(
+                    self.counter_dict['num_simulations'], self.counter_dict['num_simulations'] / max(elapsed_time, 1e-9)))
             if None in (self.search_result_best_action, self.search_result_best_leaf_state , self.search_result_best_exp_util):
                 self.update_status_and_ui(FINISHED_NO_RESULT)
             else:
@@ -1192,6 +1237,7 @@ class ConnectFourGUI(Lab2GUI_SEARCH):
 GAME_CLASSES_AND_GUIS = {'roomba': (RoombaRaceGameState, RoombaRaceGUI),
                         'tictactoe': (TicTacToeGameState,TicTacToeGUI),
                         'connectfour': (ConnectFourGameState, ConnectFourGUI),
+                        'connectfour_bitboard': (ConnectFourBitboardGameState, ConnectFourGUI),
                         'nim': (NimGameState, NimGUI)}
 
 if len(argv) < 3 :
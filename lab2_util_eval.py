@@ -5,7 +5,7 @@
 from __future__ import annotations
 from typing import List, Collection, Tuple, Callable, Optional, Union, Set, Dict, Type, Iterable
 
-from connectfour_gamestate import ConnectFourGameState
+from connectfour_gamestate import ConnectFourGameState, ConnectFourBitboardGameState
 from gamestatenode import GameStateNode
 from tictactoe_gamestate import TicTacToeGameState
 from nim_gamestate import NimGameState
@@ -323,8 +323,30 @@ roomba_functions = {
 
 
 
+## Bounds on the values each function can return: (lowest, highest). ###########
+## Bounded expectimax (Star1/Star2 pruning) needs them. Functions whose values depend on the
+## board size (e.g. the Roomba Race heuristics) are left out, so they can't be bounded.
+value_bounds : Dict[Callable, Tuple[Union[int, float], Union[int, float]]] = {
+    basic_endgame_utility: (-1000, 1000),
+    faster_endgame_utility: (-1001, 1001), # the path to an endgame is at least 1 move long
+    always_zero: (0, 0),
+    empty_rows_eval_nim: (0, 1),
+    space_values_eval_tictactoe: (-15, 15), # all the space values add up to 15
+    win_paths_eval_tictactoe: (-8, 8), # 8 lines
+    # 69 lines of 4, and a non-endgame line has at most 3 of one player's pieces
+    open_paths_connectfour: (-69 * open_path_scores[3], 69 * open_path_scores[3]),
+}
+
+def get_value_bounds(*fns : Callable) -> Optional[Tuple[Union[int, float], Union[int, float]]]:
+    """ Bounds on every value any of fns can return (see value_bounds), or None if any are unknown. """
+    if any(fn not in value_bounds for fn in fns):
+        return None
+    return min(value_bounds[fn][0] for fn in fns), max(value_bounds[fn][1] for fn in fns)
+
+
 ## Dictionary mapping games to their appropriate evaluation functions. Used by the GUIs
 all_fn_dicts = { RoombaRaceGameState: roomba_functions,
     ConnectFourGameState: connectfour_functions,
+    ConnectFourBitboardGameState: connectfour_functions,
     TicTacToeGameState: tictactoe_functions,
     NimGameState: nim_functions}
@@ -0,0 +1,216 @@
+from __future__ import annotations
+from typing import Optional, List, Tuple, Union, Hashable
+import math
+
+from gamestatenode import GameAction, GameStateNode
+
+
+class MCTSNode:
+    """
+    One node of a Monte Carlo search tree.
+
+    The node's state, its children, and its not yet expanded actions are generated once,
+    when the node is created; parent pointers let results be backed up without
+    rebuilding the state's path.
+
+    total_value is the sum of the rollout results backed up through the node, from the
+    perspective of the player who chose to move into it (its parent's current player),
+    so a parent picks the child with the best mean value for itself.
+
+    For RAVE, amaf_value and amaf_visits are the same statistics "as if played first" (AMAF):
+    over all simulations through the parent in which the chooser played the node's action
+    at any later point, not just as the parent's move.
+
+    For MCTS-Solver, proven_winner is the game's proven outcome from the node with best play
+    (the winning player's number, or 0 for a tie), or None while it is unknown.
+    Endgames are proven when created; other nodes by prove() from their children.
+    """
+    __slots__ = ('state', 'action', 'parent', 'children', 'untried_actions',
+                 'chooser', 'total_value', 'num_visits', 'is_endgame',
+                 'amaf_move', 'amaf_value', 'amaf_visits', 'proven_winner')
+
+    def __init__(self, state : GameStateNode, action : Optional[GameAction] = None,
+            parent : Optional[MCTSNode] = None):
+        self.state = state
+        self.action = action
+        self.parent = parent
+        self.children : List[MCTSNode] = []
+        self.is_endgame = state.is_endgame_state()
+        # Reversed, so popping from the end expands them in the game's order
+        self.untried_actions : List[GameAction] = [] if self.is_endgame else state.get_all_actions()[::-1]
+        self.chooser = None if parent is None else parent.state.get_current_player()
+        self.total_value = 0
+        self.num_visits = 0
+        self.amaf_move = None if parent is None else parent.state.amaf_move(action)
+        self.amaf_value = 0
+        self.amaf_visits = 0
+        self.proven_winner = state.endgame_winner() if self.is_endgame else None
+
+    def is_fully_expanded(self) -> bool:
+        return not self.untried_actions
+
+    def count_nodes(self) -> int:
+        """ The number of nodes in this node's subtree, including itself """
+        num_nodes, stack = 0, [self]
+        while stack:
+            node = stack.pop()
+            num_nodes += 1
+            stack.extend(node.children)
+        return num_nodes
+
+    def expand(self) -> MCTSNode:
+        """ Add the child for the next untried action, and return it """
+        action = self.untried_actions.pop()
+        child = MCTSNode(self.state.generate_next_state(action), action, self)
+        self.children.append(child)
+        return child
+
+    def mean_value(self) -> Union[int, float]:
+        return self.total_value / self.num_visits
+
+    def unproven_children(self) -> List[MCTSNode]:
+        return [child for child in self.children if child.proven_winner is None]
+
+    def best_uct_child(self, exploration_bias : Union[int, float], solver : bool = False) -> MCTSNode:
+        """
+        The child with the highest UCT (Upper Confidence bound for Trees) score:
+        mean value + exploration_bias * sqrt(2 ln(parent visits) / child visits).
+        Every child must have been visited.
+        If solver, proven children are skipped (this node must not be proven).
+        """
+        log_num_visits = math.log(self.num_visits)
+        return max(self.unproven_children() if solver else self.children, key = lambda child:
+            child.total_value / child.num_visits + exploration_bias * math.sqrt(2 * log_num_visits / child.num_visits))
+
+    def best_rave_child(self, exploration_bias : Union[int, float],
+            rave_equivalence : Union[int, float], solver : bool = False) -> MCTSNode:
+        """
+        The child with the highest RAVE score: like best_uct_child, but the mean value
+        is blended with the AMAF mean value as (1 - beta) * mean + beta * AMAF mean,
+        where beta = sqrt(rave_equivalence / (3 * child visits + rave_equivalence))
+        fades from 1 towards 0 as the child's own statistics grow.
+        Every child must have been visited.
+        If solver, proven children are skipped (this node must not be proven).
+        """
+        log_num_visits = math.log(self.num_visits)
+        def score(child):
+            mean_value = child.total_value / child.num_visits
+            if child.amaf_visits:
+                beta = math.sqrt(rave_equivalence / (3 * child.num_visits + rave_equivalence))
+                mean_value = (1 - beta) * mean_value + beta * child.amaf_value / child.amaf_visits
+            return mean_value + exploration_bias * math.sqrt(2 * log_num_visits / child.num_visits)
+        return max(self.unproven_children() if solver else self.children, key = score)
+
+    def most_visited_child(self, solver : bool = False) -> Optional[MCTSNode]:
+        """
+        The most visited child (the first, if tied), or None if there are no children.
+        If solver, the most visited of the children proven to win for the player to move if any,
+        or else of those not proven to lose.
+        """
+        children = self.children
+        if solver:
+            player = self.state.get_current_player()
+            children = ([child for child in children if child.proven_winner == player]
+                or [child for child in children if child.proven_winner in (None, 0, player)]
+                or children)
+        return max(children, key = lambda child: child.num_visits) if children else None
+
+    def prove(self) -> bool:
+        """
+        Try to prove this node's outcome from its children's: a win for the player to move
+        if any child is a proven win for them; otherwise, once every child is proven,
+        a tie if any child is, or else a loss. Returns whether the node is proven.
+        """
+        if self.proven_winner is not None:
+            return True
+        player = self.state.get_current_player()
+        if any(child.proven_winner == player for child in self.children):
+            self.proven_winner = player
+        elif not self.untried_actions and all(child.proven_winner is not None for child in self.children):
+            # (No child wins for player, so a non-tie outcome is the opponent's win)
+            self.proven_winner = min(child.proven_winner for child in self.children)
+        return self.proven_winner is not None
+
+    def propagate_proof(self) -> None:
+        """ If this node is proven, try to prove its ancestors in turn, as far as they can be """
+        node = self
+        while node.proven_winner is not None and node.parent is not None and node.parent.prove():
+            node = node.parent
+
+    def backpropagate(self, value : Union[int, float], player : int, num_rollouts : int = 1) -> None:
+        """
+        Back up the summed results (value, from player's perspective) of num_rollouts rollouts
+        from this node to the root.
+        The game is zero-sum, so the result counts negatively for the other player's choices.
+        """
+        node = self
+        while node.parent is not None:
+            node.total_value += value if node.chooser == player else -value
+            node.num_visits += num_rollouts
+            node = node.parent
+        node.num_visits += num_rollouts # the root
+
+    def find_descendant(self, state : GameStateNode, max_depth : int = 2) -> Optional[MCTSNode]:
+        """
+        The node for state among this node and its descendants up to max_depth moves below it
+        (e.g. after this agent's move and the opponent's reply), or None if it was never expanded.
+        """
+        level = [self]
+        for depth in range(max_depth + 1):
+            for node in level:
+                if node.state == state:
+                    return node
+            level = [child for node in level for child in node.children]
+        return None
+
+    def make_root(self, state : Optional[GameStateNode] = None) -> None:
+        """
+        Detach this node from its parent, so it can be the root of a new search, keeping
+        its subtree and statistics. Its siblings and ancestors are no longer referenced.
+        If state (equal to this node's state) is given, it replaces the node's state,
+        and paths of the states in the subtree start from it.
+        """
+        self.parent = None
+        self.chooser = None
+        if state is not None:
+            self.state = state
+            for child in self.children:
+                child.state.parent = state
+
+    def backpropagate_amaf(self, value : Union[int, float], player : int,
+            moves_played : List[Tuple[int, Hashable]]) -> None:
+        """
+        Update the AMAF statistics for one rollout from this node, whose result was value
+        (from player's perspective) and whose moves were moves_played
+        ((player, amaf_move) pairs, see GameStateNode.amaf_move).
+        At every node on the path to the root, each child is credited if its chooser
+        played its action at any point below that node, in the tree or in the rollout.
+        """
+        played = set(moves_played)
+        node = self
+        while node is not None:
+            for child in node.children:
+                if (child.chooser, child.amaf_move) in played:
+                    child.amaf_value += value if child.chooser == player else -value
+                    child.amaf_visits += 1
+            if node.parent is not None:
+                played.add((node.chooser, node.amaf_move))
+            node = node.parent
+
+    def add_virtual_loss(self, value : Union[int, float], num_rollouts : int = 1) -> None:
+        """
+        For tree-parallel search: count num_rollouts pending rollouts from this node
+        as visits that lost value, on the path from this node to the root,
+        so other searchers selecting meanwhile are steered to other paths.
+        """
+        node = self
+        while node.parent is not None:
+            node.total_value -= value * num_rollouts
+            node.num_visits += num_rollouts
+            node = node.parent
+        node.num_visits += num_rollouts # the root
+
+    def remove_virtual_loss(self, value : Union[int, float], num_rollouts : int = 1) -> None:
+        """ Undo add_virtual_loss, once the pending rollouts' results are in """
+        # (-value * -num_rollouts would count the loss again)
+        self.add_virtual_loss(value, -num_rollouts)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+from typing import Optional, Dict, List, Tuple, Sequence, Union
+from collections import defaultdict
+
+from gamestatenode import GameAction, GameStateNode
+
+INF = float('inf')
+
+
+class MoveOrderer:
+    """
+    Orders moves for alpha-beta style searches, so the moves most likely to cause
+    a cutoff are searched first. Actions are ranked by, in order of priority:
+        1) the transposition table move - the best move stored for the state by an earlier search
+        2) killer moves - moves that recently caused a cutoff at the same ply (depth below the root),
+           often because they are just as strong in sibling positions
+        3) the history heuristic - how much (and how deeply) the move has caused cutoffs
+           anywhere in the tree, for the player making it
+    Ties keep the order they were given in (e.g. the game's custom_move_ordering, or a random shuffle).
+
+    Moves are remembered by their action_to_str, so killers and history
+    carry over between different states (and GameAction types) of the same game.
+    """
+    def __init__(self, num_killers : int = 2):
+        self.num_killers = num_killers
+        self.killers : Dict[int, List[str]] = defaultdict(list)
+        self.history : Dict[Tuple[int, str], Union[int, float]] = defaultdict(int)
+
+    def new_search(self) -> None:
+        """
+        Call at the start of each search. Killer moves are relative to the root,
+        so they are forgotten; history scores are kept, but halved so that
+        recent searches count for more.
+        """
+        self.killers.clear()
+        for key in self.history:
+            self.history[key] /= 2
+
+    def clear(self) -> None:
+        """ Forget all killer moves and history """
+        self.killers.clear()
+        self.history.clear()
+
+    def order_actions(self, state : GameStateNode, actions : Sequence[GameAction], ply : int,
+            tt_move : Optional[GameAction] = None) -> List[GameAction]:
+        """
+        Returns actions (the legal actions of state, which is ply moves below the root)
+        sorted best-first.
+        """
+        action_to_str = state.action_to_str
+        player = state.get_current_player()
+        killers = self.killers.get(ply, ())
+        def priority(action):
+            action_str = action_to_str(action)
+            return (action == tt_move, action_str in killers, self.history.get((player, action_str), 0))
+        return sorted(actions, key = priority, reverse = True)
+
+    def record_cutoff(self, state : GameStateNode, action : GameAction, ply : int,
+            depth_left : Union[int, float]) -> None:
+        """
+        Record that action caused a cutoff at state (ply moves below the root,
+        with depth_left more moves to search below it).
+        """
+        action_str = state.action_to_str(action)
+        killers = self.killers[ply]
+        if action_str in killers:
+            killers.remove(action_str)
+        killers.insert(0, action_str)
+        del killers[self.num_killers:]
+        # Cutoffs near the root save more work, so they count for more
+        self.history[(state.get_current_player(), action_str)] += depth_left * depth_left if depth_left != INF else 1
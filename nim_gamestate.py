@@ -1,10 +1,14 @@
-from gamestatenode import GameStateNode
+from gamestatenode import GameStateNode, ZobristKeys
 from copy import deepcopy
 import re
+import random
 """
 A GameStateNode representation of the game Tic Tac Toe.
 """
 
+# Zobrist keys for tokens (pile, num_stones) and ('player', current_player)
+ZOBRIST_KEYS = ZobristKeys("nim")
+
 class NimGameState(GameStateNode):
 
     """
@@ -97,19 +101,21 @@ class NimGameState(GameStateNode):
     path_length: the number of actions taken in the path to reach the state (aka number of plies)
     previous_action: whatever action was last taken to arrive at this state
     current_player: the number of the player whose turn it is to take an action
+    zobrist_key: (optional) Zobrist key of the state, if already known
 
 
 
     Use super().__init__() to call this function in the subclass __init__()
     """
     def __init__(self, board_array, move_limits,
-        parent, path_length, previous_action, current_player) :
+        parent, path_length, previous_action, current_player, zobrist_key = None) :
         self.board_array = board_array
         self.move_limits = move_limits
         super().__init__(parent = parent,
             path_length = path_length,
             previous_action = previous_action,
-            current_player = current_player)
+            current_player = current_player,
+            zobrist_key = zobrist_key)
 
     """
     Returns a full feature representation of the environment's current state.
@@ -123,6 +129,16 @@ class NimGameState(GameStateNode):
     def get_all_features(self) :
         return tuple(self.board_array), self.current_player
 
+    """
+    Computes the Zobrist key from scratch: the XOR of the keys of every
+    pile's stone count and of the current player.
+    """
+    def compute_zobrist_key(self) :
+        key = ZOBRIST_KEYS[('player', self.current_player)]
+        for pile, stones in enumerate(self.board_array):
+            key ^= ZOBRIST_KEYS[(pile, stones)]
+        return key
+
     """
     Returns True if an endgame state.
     Since nonzero numbers are interpreted as "True" in Python,
@@ -173,14 +189,65 @@ class NimGameState(GameStateNode):
 
         new_board = deepcopy(self.board_array)
         new_board[pile] -= rem_stones
+        next_player = self.current_player % 2 + 1
+
+        # Incremental Zobrist update: change one pile's count, swap the current player
+        new_key = (self.get_zobrist_key()
+            ^ ZOBRIST_KEYS[(pile, self.board_array[pile])] ^ ZOBRIST_KEYS[(pile, new_board[pile])]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
 
         return NimGameState(board_array = new_board,
             move_limits = self.move_limits,
             parent = self,
             path_length = self.path_length + 1,
             previous_action = action,
-            current_player = self.current_player % 2 + 1)
+            current_player = next_player,
+            zobrist_key = new_key)
+
+
+    """
+    Apply the action to this state in place (see GameStateNode.make_move).
+    """
+    def make_move(self, action) :
+        pile, rem_stones = action
+        next_player = self.current_player % 2 + 1
+        new_key = (self.get_zobrist_key()
+            ^ ZOBRIST_KEYS[(pile, self.board_array[pile])] ^ ZOBRIST_KEYS[(pile, self.board_array[pile] - rem_stones)]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
+        self.board_array[pile] -= rem_stones
+        self.push_undo_record(action, next_player, new_key)
 
+    """
+    Undo the last make_move (see GameStateNode.unmake_move).
+    """
+    def unmake_move(self) :
+        pile, rem_stones = self.previous_action
+        self.pop_undo_record()
+        self.board_array[pile] += rem_stones
+
+    """
+    Play random moves until the game ends (see GameStateNode.random_playout),
+    directly on a copy of the piles.
+    """
+    def random_playout(self, moves_played = None) :
+        board = list(self.board_array)
+        move_limits = self.move_limits
+        player, path_length, action = self.current_player, self.path_length, self.previous_action
+        while any(board):
+            action = random.choice([(pile, rem_stones) for pile, max_stones in enumerate(board)
+                                    for rem_stones in range(1, max_stones + 1)
+                                    if move_limits == None or rem_stones in move_limits])
+            if moves_played is not None:
+                moves_played.append((player, action))
+            board[action[0]] -= action[1]
+            player = player % 2 + 1
+            path_length += 1
+        return NimGameState(board_array = board,
+            move_limits = move_limits,
+            parent = None,
+            path_length = path_length,
+            previous_action = action,
+            current_player = player)
 
     """
     Return a string representation of the State
@@ -1,10 +1,15 @@
-from gamestatenode import GameStateNode
+from gamestatenode import GameStateNode, ZobristKeys
 from copy import deepcopy
+import random
 
 FLOOR = '.'
 WALL = '#'
 CLEANED = (None,'-','~') # If cleaned by player 1, '-'. If cleaned by player 2 '~'
 
+# Zobrist keys for tokens (row, col, terrain) of non-floor cells,
+# ('position', player, row, col) and ('player', current_player)
+ZOBRIST_KEYS = ZobristKeys("roomba")
+
 
 class RoombaRaceGameState(GameStateNode):
 
@@ -93,14 +98,15 @@ class RoombaRaceGameState(GameStateNode):
     path_length: the number of actions taken in the path to reach the state (aka number of plies)
     previous_action: whatever action was last taken to arrive at this state
     current_player: the number of the player whose turn it is to take an action
+    zobrist_key: (optional) Zobrist key of the state, if already known
 
     In any subclass of GameStateNode, the __init__() should take and store
     additional parameters that define its state.
 
     Use super().__init__() to call this function in the subclass __init__()
     """
-    def __init__(self, positions, grid,  parent, path_length, previous_action, current_player):
-        super().__init__(parent, path_length, previous_action, current_player)
+    def __init__(self, positions, grid,  parent, path_length, previous_action, current_player, zobrist_key = None):
+        super().__init__(parent, path_length, previous_action, current_player, zobrist_key)
 
         self.positions = positions
         self.grid = grid
@@ -119,6 +125,20 @@ class RoombaRaceGameState(GameStateNode):
     def get_all_features(self) :
         return (tuple(tuple(pos) for pos in self.positions), tuple(tuple(row) for row in self.grid) )
 
+    """
+    Computes the Zobrist key from scratch: the XOR of the keys of every
+    non-floor cell, each player's position, and the current player.
+    """
+    def compute_zobrist_key(self) :
+        key = ZOBRIST_KEYS[('player', self.current_player)]
+        for p in RoombaRaceGameState.player_numbers:
+            key ^= ZOBRIST_KEYS[('position', p) + tuple(self.get_position(p))]
+        for r, row in enumerate(self.grid):
+            for c, terrain in enumerate(row):
+                if terrain != FLOOR:
+                    key ^= ZOBRIST_KEYS[(r, c, terrain)]
+        return key
+
 
     """
     Returns number of winning player if an endgame state.
@@ -192,15 +212,98 @@ class RoombaRaceGameState(GameStateNode):
         new_grid[my_r][my_c] = CLEANED[self.current_player]
         new_positions = deepcopy(self.positions)
         new_positions[self.current_player-1] = (new_r, new_c)
+        next_player = self.current_player % 2 + 1
+
+        # Incremental Zobrist update: clean the old cell, move the roomba, swap the current player
+        new_key = (self.get_zobrist_key()
+            ^ ZOBRIST_KEYS[(my_r, my_c, CLEANED[self.current_player])]
+            ^ ZOBRIST_KEYS[('position', self.current_player, my_r, my_c)]
+            ^ ZOBRIST_KEYS[('position', self.current_player, new_r, new_c)]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
+        if self.grid[my_r][my_c] != FLOOR:
+            new_key ^= ZOBRIST_KEYS[(my_r, my_c, self.grid[my_r][my_c])]
+
         return RoombaRaceGameState(
                         positions = new_positions,
                         grid = new_grid,
                         parent = self,
                         path_length = self.path_length + 1,
                         previous_action = action,
-                        current_player = self.current_player % 2 + 1
+                        current_player = next_player,
+                        zobrist_key = new_key
                         )
 
+    """
+    Apply the action to this state in place (see GameStateNode.make_move).
+    The old position and the terrain it leaves behind are the undo record.
+    """
+    def make_move(self, action) :
+        dr, dc = action
+        my_r, my_c = self.get_position(self.current_player)
+        new_r, new_c = my_r + dr, my_c + dc
+        old_terrain = self.grid[my_r][my_c]
+        next_player = self.current_player % 2 + 1
+
+        new_key = (self.get_zobrist_key()
+            ^ ZOBRIST_KEYS[(my_r, my_c, CLEANED[self.current_player])]
+            ^ ZOBRIST_KEYS[('position', self.current_player, my_r, my_c)]
+            ^ ZOBRIST_KEYS[('position', self.current_player, new_r, new_c)]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
+        if old_terrain != FLOOR:
+            new_key ^= ZOBRIST_KEYS[(my_r, my_c, old_terrain)]
+
+        self.grid[my_r][my_c] = CLEANED[self.current_player]
+        self.positions[self.current_player-1] = (new_r, new_c)
+        self.push_undo_record(action, next_player, new_key, (my_r, my_c, old_terrain))
+
+    """
+    Undo the last make_move (see GameStateNode.unmake_move).
+    """
+    def unmake_move(self) :
+        my_r, my_c, old_terrain = self.pop_undo_record()
+        self.grid[my_r][my_c] = old_terrain
+        self.positions[self.current_player-1] = (my_r, my_c)
+
+    """
+    Moves count as the same for AMAF statistics if they clean the same square
+    (see GameStateNode.amaf_move), rather than if they go the same direction.
+    """
+    def amaf_move(self, action) :
+        my_r, my_c = self.positions[self.current_player - 1]
+        return (my_r + action[0], my_c + action[1])
+
+    """
+    Play random moves until the game ends (see GameStateNode.random_playout),
+    directly on a copy of the grid and positions - no undo records or Zobrist updates.
+    """
+    def random_playout(self, moves_played = None) :
+        grid = [row[:] for row in self.grid]
+        positions = list(self.positions)
+        height, width = len(grid), len(grid[0])
+        steps = tuple(RoombaRaceGameState.NEIGHBORING_STEPS)
+        player, path_length, action = self.current_player, self.path_length, self.previous_action
+        while True:
+            my_r, my_c = positions[player - 1]
+            other_position = positions[player % 2]
+            moves = [(dr, dc) for dr, dc in steps
+                        if 0 <= my_r + dr < height and 0 <= my_c + dc < width
+                        and grid[my_r + dr][my_c + dc] == FLOOR and (my_r + dr, my_c + dc) != other_position]
+            if not moves:
+                break
+            action = random.choice(moves)
+            if moves_played is not None:
+                moves_played.append((player, (my_r + action[0], my_c + action[1])))
+            grid[my_r][my_c] = CLEANED[player]
+            positions[player - 1] = (my_r + action[0], my_c + action[1])
+            player = player % 2 + 1
+            path_length += 1
+        return RoombaRaceGameState(positions = positions,
+                            grid = grid,
+                            parent = None,
+                            path_length = path_length,
+                            previous_action = action,
+                            current_player = player)
+
     """ Additional accessor methods used the GUI """
 
     """
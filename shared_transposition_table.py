@@ -0,0 +1,175 @@
+from __future__ import annotations
+from typing import Optional, Dict, Iterator, Tuple, Union
+from multiprocessing import shared_memory
+import os
+import pickle
+import struct
+import weakref
+import zlib
+
+from gamestatenode import GameAction
+from transposition_table import TranspositionTable, TranspositionEntry, EXACT, LOWER, UPPER
+
+INF = float('inf')
+
+# Header: the maximizer (0 if none yet) and the generation
+HEADER = struct.Struct('<qI')
+# Entry: check word, depth, value, generation, flag (+ IS_INT), pickled best move (zero-padded)
+ENTRY = struct.Struct('<qddIB15s')
+# Set in an entry's flag byte if its value was an int (values are stored as doubles)
+IS_INT = 4
+NO_MOVE = bytes(15)
+
+def _release(shm : shared_memory.SharedMemory, owner_pid : Optional[int]) -> None:
+    """ Detach from the shared memory block, and free it if this is the process that made it """
+    shm.close()
+    # (A forked child inherits the owner's table object, but mustn't free the block)
+    if owner_pid == os.getpid():
+        shm.unlink()
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    A TranspositionTable that several processes can use at once (e.g. Lazy SMP),
+    stored in one fixed-size multiprocessing.shared_memory block rather than in dicts.
+
+    It has the same two-slot buckets and replacement policy as TranspositionTable,
+    laid out as an array of packed ENTRY records: bucket i's depth-preferred slot is
+    record 2i, and its always-replace slot is record 2i + 1. The maximizer and generation
+    are kept in the block's header, so every process sees the same ones.
+
+    There are no locks. Two processes writing the same slot at once can leave it torn
+    (half of each entry), so instead of the key each record stores the key XORed with
+    a checksum of the rest of the record; a torn record fails the check, and just reads
+    as missing. (This is Hyatt's "lockless hashing".)
+
+    Keys must be the same in every process, as Zobrist keys are (see ZobristKeys).
+    Best moves are stored pickled, so only small ones fit (at most 15 bytes pickled,
+    e.g. ints and short tuples of ints); bigger ones are stored as no move.
+
+    Pickling the table (e.g. to send it to a worker process) sends just the block's name,
+    and unpickling attaches to the same block. stats are counted separately in each process.
+    The process that created the block frees it once its table object is garbage collected
+    (or on close()).
+    """
+    def __init__(self, num_buckets : int = 2 ** 16):
+        self.shm = shared_memory.SharedMemory(create = True, size = HEADER.size + 2 * num_buckets * ENTRY.size)
+        self._attach(num_buckets, owner = True)
+        HEADER.pack_into(self.shm.buf, 0, 0, 0)
+
+    def _attach(self, num_buckets : int, owner : bool) -> None:
+        self.num_buckets = num_buckets
+        self.stats = {'num_lookups': 0, 'num_hits': 0, 'num_stores': 0, 'num_overwrites': 0}
+        # Unpickled best moves, by their padded pickles
+        self.moves : Dict[bytes, GameAction] = {NO_MOVE: None}
+        self._finalizer = weakref.finalize(self, _release, self.shm, os.getpid() if owner else None)
+
+    def __getstate__(self) -> Tuple[str, int]:
+        return self.shm.name, self.num_buckets
+
+    def __setstate__(self, state : Tuple[str, int]) -> None:
+        name, num_buckets = state
+        self.shm = shared_memory.SharedMemory(name = name)
+        self._attach(num_buckets, owner = False)
+
+    def close(self) -> None:
+        """ Detach from the shared block now (freeing it, if this process made it) """
+        self._finalizer()
+
+    @property
+    def maximizer(self) -> Optional[int]:
+        return HEADER.unpack_from(self.shm.buf, 0)[0] or None
+
+    @property
+    def generation(self) -> int:
+        return HEADER.unpack_from(self.shm.buf, 0)[1]
+
+    def _read(self, record : int) -> Optional[TranspositionEntry]:
+        """ The entry in the given record, or None if it is empty or torn """
+        offset = HEADER.size + record * ENTRY.size
+        check, depth, value, generation, flag, move = ENTRY.unpack_from(self.shm.buf, offset)
+        if check == 0:
+            return None
+        key = check ^ zlib.crc32(self.shm.buf[offset + 8 : offset + ENTRY.size])
+        if record // 2 != self.bucket_index(key):
+            return None
+        best_move = self.moves.get(move)
+        if best_move is None and move != NO_MOVE:
+            best_move = self.moves[move] = pickle.loads(move)
+        return TranspositionEntry(key, depth, int(value) if flag & IS_INT else value, flag & ~IS_INT,
+            best_move, generation)
+
+    def _write(self, record : int, entry : TranspositionEntry) -> None:
+        offset = HEADER.size + record * ENTRY.size
+        move = NO_MOVE
+        if entry.best_move is not None:
+            move = pickle.dumps(entry.best_move, protocol = 2)
+            move = move.ljust(15, b'\0') if len(move) <= 15 else NO_MOVE
+        flag = entry.flag | (IS_INT if isinstance(entry.value, int) else 0)
+        ENTRY.pack_into(self.shm.buf, offset, 0, entry.depth, entry.value, entry.generation, flag, move)
+        check = entry.key ^ zlib.crc32(self.shm.buf[offset + 8 : offset + ENTRY.size])
+        struct.pack_into('<q', self.shm.buf, offset, check)
+
+    def _erase(self, record : int) -> None:
+        offset = HEADER.size + record * ENTRY.size
+        self.shm.buf[offset : offset + ENTRY.size] = bytes(ENTRY.size)
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self.entries())
+
+    def entries(self) -> Iterator[TranspositionEntry]:
+        for record in range(2 * self.num_buckets):
+            entry = self._read(record)
+            if entry is not None:
+                yield entry
+
+    def clear(self) -> None:
+        self.shm.buf[HEADER.size:] = bytes(len(self.shm.buf) - HEADER.size)
+
+    def new_search(self, maximizer : int) -> None:
+        if maximizer != self.maximizer:
+            self.clear()
+            HEADER.pack_into(self.shm.buf, 0, maximizer, self.generation)
+
+    def next_generation(self, max_age : Optional[int] = None) -> None:
+        generation = self.generation + 1
+        HEADER.pack_into(self.shm.buf, 0, self.maximizer or 0, generation)
+        if max_age is not None:
+            for record in range(2 * self.num_buckets):
+                entry = self._read(record)
+                if entry is not None and entry.generation < generation - max_age:
+                    self._erase(record)
+
+    def lookup(self, key : int) -> Optional[TranspositionEntry]:
+        self.stats['num_lookups'] += 1
+        index = self.bucket_index(key)
+        entry = self._read(2 * index)
+        if entry is None or entry.key != key:
+            entry = self._read(2 * index + 1)
+            if entry is None or entry.key != key:
+                return None
+        self.stats['num_hits'] += 1
+        return entry
+
+    def store(self, key : int, depth : Union[int, float], value : Union[int, float],
+            flag : int = EXACT, best_move : Optional[GameAction] = None) -> None:
+        self.stats['num_stores'] += 1
+        index = self.bucket_index(key)
+        generation = self.generation
+        entry = TranspositionEntry(key, depth, value, flag, best_move, generation)
+        old_entry = self._read(2 * index)
+        always_replace_entry = self._read(2 * index + 1)
+        if (old_entry is None or old_entry.key == key or depth >= old_entry.depth
+                or old_entry.generation != generation):
+            if old_entry is not None and old_entry.key != key:
+                self.stats['num_overwrites'] += 1
+                # Demote the old entry rather than losing it outright
+                self._write(2 * index + 1, old_entry)
+            elif always_replace_entry is not None and always_replace_entry.key == key:
+                # Don't keep a stale copy of the same state around
+                self._erase(2 * index + 1)
+            self._write(2 * index, entry)
+        else:
+            if always_replace_entry is not None and always_replace_entry.key != key:
+                self.stats['num_overwrites'] += 1
+            self._write(2 * index + 1, entry)
@@ -1,10 +1,14 @@
-from gamestatenode import GameStateNode
+from gamestatenode import GameStateNode, ZobristKeys
 from copy import deepcopy
 import re
+import random
 """
 A GameStateNode representation of the game Tic Tac Toe.
 """
 
+# Zobrist keys for tokens (row, col, piece) and ('player', current_player)
+ZOBRIST_KEYS = ZobristKeys("tictactoe")
+
 class TicTacToeGameState(GameStateNode):
 
     num_rows = 3  # board height
@@ -94,18 +98,20 @@ class TicTacToeGameState(GameStateNode):
     path_length: the number of actions taken in the path to reach the state (aka number of plies)
     previous_action: whatever action was last taken to arrive at this state
     current_player: the number of the player whose turn it is to take an action
+    zobrist_key: (optional) Zobrist key of the state, if already known
 
 
 
     Use super().__init__() to call this function in the subclass __init__()
     """
     def __init__(self, board_array,
-        parent, path_length, previous_action, current_player) :
+        parent, path_length, previous_action, current_player, zobrist_key = None) :
         self.board_array = board_array
         super().__init__(parent = parent,
             path_length = path_length,
             previous_action = previous_action,
-            current_player = current_player)
+            current_player = current_player,
+            zobrist_key = zobrist_key)
 
     """
     Returns a full feature representation of the environment's current state.
@@ -119,6 +125,18 @@ class TicTacToeGameState(GameStateNode):
     def get_all_features(self) :
         return tuple(tuple(row) for row in self.board_array)
 
+    """
+    Computes the Zobrist key from scratch: the XOR of the keys of every
+    piece on the board and of the current player.
+    """
+    def compute_zobrist_key(self) :
+        key = ZOBRIST_KEYS[('player', self.current_player)]
+        for r, row in enumerate(self.board_array):
+            for c, piece in enumerate(row):
+                if piece != 0:
+                    key ^= ZOBRIST_KEYS[(r, c, piece)]
+        return key
+
     """
     Returns True if an endgame state.
     Since nonzero numbers are interpreted as "True" in Python,
@@ -190,13 +208,69 @@ class TicTacToeGameState(GameStateNode):
 
         new_board = deepcopy(self.board_array)
         new_board[row][col] = self.current_player
+        next_player = self.current_player % 2 + 1
+
+        # Incremental Zobrist update: add the new piece, swap the current player
+        new_key = (self.get_zobrist_key() ^ ZOBRIST_KEYS[(row, col, self.current_player)]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
 
         return TicTacToeGameState(board_array = new_board,
             parent = self,
             path_length = self.path_length + 1,
             previous_action = action,
-            current_player = self.current_player % 2 + 1)
+            current_player = next_player,
+            zobrist_key = new_key)
+
 
+    """
+    Apply the action to this state in place (see GameStateNode.make_move).
+    """
+    def make_move(self, action) :
+        row, col = action
+        next_player = self.current_player % 2 + 1
+        new_key = (self.get_zobrist_key() ^ ZOBRIST_KEYS[(row, col, self.current_player)]
+            ^ ZOBRIST_KEYS[('player', self.current_player)] ^ ZOBRIST_KEYS[('player', next_player)])
+        self.board_array[row][col] = self.current_player
+        self.push_undo_record(action, next_player, new_key)
+
+    """
+    Undo the last make_move (see GameStateNode.unmake_move).
+    """
+    def unmake_move(self) :
+        row, col = self.previous_action
+        self.pop_undo_record()
+        self.board_array[row][col] = 0
+
+    """
+    Play random moves until the game ends (see GameStateNode.random_playout),
+    directly on a copy of the board, only checking the lines through each new piece for a win.
+    """
+    def random_playout(self, moves_played = None) :
+        num_rows, num_cols = TicTacToeGameState.num_rows, TicTacToeGameState.num_cols
+        board = [row[:] for row in self.board_array]
+        player, path_length, action = self.current_player, self.path_length, self.previous_action
+        # (A board read from a file may already be won)
+        empty_cells = [] if self.endgame_winner() else self.get_all_actions()
+        while empty_cells:
+            action = random.choice(empty_cells)
+            if moves_played is not None:
+                moves_played.append((player, action))
+            empty_cells.remove(action)
+            row, col = action
+            board[row][col] = player
+            path_length += 1
+            won = (all(board[row][c] == player for c in range(num_cols))
+                or all(board[r][col] == player for r in range(num_rows))
+                or (row == col and all(board[i][i] == player for i in range(num_rows)))
+                or (row + col == num_cols - 1 and all(board[num_rows - 1 - i][i] == player for i in range(num_rows))))
+            player = player % 2 + 1
+            if won:
+                break
+        return TicTacToeGameState(board_array = board,
+            parent = None,
+            path_length = path_length,
+            previous_action = action,
+            current_player = player)
 
     """
     Return a string representation of the State
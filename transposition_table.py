@@ -0,0 +1,177 @@
+from __future__ import annotations
+from typing import Optional, Dict, Iterator, Union
+
+from gamestatenode import GameAction
+
+INF = float('inf')
+
+""" Flags describing what a stored value means.
+EXACT: the true (depth-limited) value of the state.
+LOWER: a lower bound - the search failed high (value >= beta), so the true value may be higher.
+UPPER: an upper bound - the search failed low (value <= alpha), so the true value may be lower. """
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionEntry:
+    """
+    One stored search result.
+    key is the full hash (Zobrist key) of the state, depth is the remaining search
+    depth below it when it was searched (INF for exact endgame results),
+    and value is from the maximizer's perspective.
+    """
+    __slots__ = ('key', 'depth', 'value', 'flag', 'best_move', 'generation')
+
+    def __init__(self, key : int, depth : Union[int, float], value : Union[int, float],
+            flag : int, best_move : Optional[GameAction], generation : int):
+        self.key = key
+        self.depth = depth
+        self.value = value
+        self.flag = flag
+        self.best_move = best_move
+        self.generation = generation
+
+    def __repr__(self) -> str:
+        return "TranspositionEntry(key={}, depth={}, value={}, flag={}, best_move={}, generation={})".format(
+            self.key, self.depth, self.value, ("EXACT", "LOWER", "UPPER")[self.flag], self.best_move, self.generation)
+
+
+class TranspositionTable:
+    """
+    A size-bounded transposition table, keyed by state hashes (Zobrist keys)
+    rather than by GameStateNode objects, so it never holds on to states or their parent chains.
+
+    The table has num_buckets buckets, each with two slots:
+        - a depth-preferred slot, only replaced by a result searched at least as deeply
+          (or by any result, if its entry is from an older generation)
+        - an always-replace slot, which takes every result the depth-preferred slot rejects
+    so there are never more than 2 * num_buckets entries.
+
+    Values are always from one maximizer's perspective; new_search() clears
+    the table if the maximizer changes.
+
+    A table can be kept across several searches (e.g. an agent's successive moves).
+    Each entry is tagged with the generation it was stored in; next_generation()
+    starts a new one, so older entries lose their depth-preferred slots and
+    can be evicted once they are too old.
+    """
+    def __init__(self, num_buckets : int = 2 ** 18):
+        self.num_buckets = num_buckets
+        self.depth_preferred : Dict[int, TranspositionEntry] = {}
+        self.always_replace : Dict[int, TranspositionEntry] = {}
+        self.maximizer : Optional[int] = None
+        self.generation = 0
+        self.stats = {'num_lookups': 0, 'num_hits': 0, 'num_stores': 0, 'num_overwrites': 0}
+
+    def __len__(self) -> int:
+        return len(self.depth_preferred) + len(self.always_replace)
+
+    def entries(self) -> Iterator[TranspositionEntry]:
+        """ Iterate over all stored entries """
+        yield from self.depth_preferred.values()
+        yield from self.always_replace.values()
+
+    def clear(self) -> None:
+        """ Remove all entries (keeps the stats and generation counter) """
+        self.depth_preferred.clear()
+        self.always_replace.clear()
+
+    def reset_stats(self) -> None:
+        """ Zero the lookup / hit / store / overwrite counts """
+        for stat in self.stats:
+            self.stats[stat] = 0
+
+    def new_search(self, maximizer : int) -> None:
+        """
+        Call at the start of each search. Values are stored from the maximizer's
+        perspective, so a search for a different maximizer starts from an empty table.
+        """
+        if maximizer != self.maximizer:
+            self.clear()
+            self.maximizer = maximizer
+
+    def next_generation(self, max_age : Optional[int] = None) -> None:
+        """
+        Start a new generation (e.g. before searching the next move of a game).
+        If max_age is given, evict entries more than max_age generations old.
+        """
+        self.generation += 1
+        if max_age is not None:
+            oldest_generation = self.generation - max_age
+            for slots in (self.depth_preferred, self.always_replace):
+                for index in [index for index, entry in slots.items() if entry.generation < oldest_generation]:
+                    del slots[index]
+
+    def bucket_index(self, key : int) -> int:
+        """
+        The bucket for key. Keys' low bits can be far from random (e.g. ConnectFour
+        bitboard keys), so the key is scrambled first by Fibonacci hashing:
+        the high bits of key * 2^64 / golden ratio depend on all of its bits.
+        """
+        return (((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % self.num_buckets
+
+    def lookup(self, key : int) -> Optional[TranspositionEntry]:
+        """ Returns the entry for key, or None if it isn't stored """
+        self.stats['num_lookups'] += 1
+        index = self.bucket_index(key)
+        entry = self.depth_preferred.get(index)
+        if entry is None or entry.key != key:
+            entry = self.always_replace.get(index)
+            if entry is None or entry.key != key:
+                return None
+        self.stats['num_hits'] += 1
+        return entry
+
+    def probe(self, key : int, depth : Union[int, float],
+            alpha : Union[int, float] = -INF, beta : Union[int, float] = INF) -> Optional[Union[int, float]]:
+        """
+        Returns a stored value that can be used in place of searching the state
+        to the given remaining depth within the (alpha, beta) window, or None if
+        there is no such value (missing, searched too shallowly, or a bound that doesn't cut).
+        """
+        entry = self.probe_entry(key, depth, alpha, beta)
+        return None if entry is None else entry.value
+
+    def probe_entry(self, key : int, depth : Union[int, float],
+            alpha : Union[int, float] = -INF, beta : Union[int, float] = INF) -> Optional[TranspositionEntry]:
+        """ Like probe, but returns the usable entry itself (or None) """
+        entry = self.lookup(key)
+        if entry is None or entry.depth < depth:
+            return None
+        if entry.flag == EXACT:
+            return entry
+        if entry.flag == LOWER and entry.value >= beta:
+            return entry
+        if entry.flag == UPPER and entry.value <= alpha:
+            return entry
+        return None
+
+    def get_best_move(self, key : int) -> Optional[GameAction]:
+        """ Returns the best move stored for key (if any), useful for move ordering """
+        entry = self.lookup(key)
+        return None if entry is None else entry.best_move
+
+    def store(self, key : int, depth : Union[int, float], value : Union[int, float],
+            flag : int = EXACT, best_move : Optional[GameAction] = None) -> None:
+        """
+        Store a search result, following the two-tier replacement policy.
+        """
+        self.stats['num_stores'] += 1
+        index = self.bucket_index(key)
+        entry = TranspositionEntry(key, depth, value, flag, best_move, self.generation)
+        old_entry = self.depth_preferred.get(index)
+        if (old_entry is None or old_entry.key == key or depth >= old_entry.depth
+                or old_entry.generation != self.generation):
+            if old_entry is not None and old_entry.key != key:
+                self.stats['num_overwrites'] += 1
+                # Demote the old entry rather than losing it outright
+                self.always_replace[index] = old_entry
+            elif index in self.always_replace and self.always_replace[index].key == key:
+                # Don't keep a stale copy of the same state around
+                del self.always_replace[index]
+            self.depth_preferred[index] = entry
+        else:
+            if index in self.always_replace and self.always_replace[index].key != key:
+                self.stats['num_overwrites'] += 1
+            self.always_replace[index] = entry